@@ -52,17 +52,22 @@ INSTALLED_APPS = [
     "django_filters",
     "guardian",
     "django_extensions",
+    "opencourse.core.apps.CoreConfig",
     "opencourse.courses.apps.CoursesConfig",
     "opencourse.profiles.apps.ProfilesConfig",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "opencourse.core.instrumentation.MetricsMiddleware",
+    "opencourse.core.instrumentation.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "opencourse.core.profiling.ProfilingMiddleware",
+    "opencourse.core.db.routers.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -92,6 +97,63 @@ WSGI_APPLICATION = "config.wsgi.application"
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
 DATABASES = {"default": env.db("DATABASE_URL")}
+# Read replicas, serving the reads of GET requests (see
+# opencourse.core.db.routers). Tests read from the default database.
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[])):
+    DATABASES[f"replica{index}"] = {
+        **env.db_url_config(url),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{index}")
+for database in DATABASES.values():
+    # Keep connections open between requests, checking them before reuse
+    database["CONN_MAX_AGE"] = env.int("DJANGO_CONN_MAX_AGE", default=60)
+    if database["ENGINE"] == "django.db.backends.postgresql":
+        database["ENGINE"] = "opencourse.core.db.postgresql"
+    # Behind pgbouncer with pool_mode = transaction, server connections change
+    # hands after every transaction, so named cursors can't be used. The
+    # server time zone must be UTC there, as a SET TIME ZONE wouldn't stick.
+    database["DISABLE_SERVER_SIDE_CURSORS"] = env.bool(
+        "DJANGO_DB_TRANSACTION_POOLING", default=False
+    )
+DATABASE_ROUTERS = ["opencourse.core.db.routers.PrimaryReplicaRouter"]
+# Seconds the reads of a client stay on the primary after it wrote
+REPLICA_STICKY_SECONDS = env.int("DJANGO_REPLICA_STICKY_SECONDS", 10)
+REPLICA_STICKY_COOKIE = "primary"
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/ref/settings/#caches
+
+REDIS_URL = env.str("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                # Behave as a cache miss when redis is down
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "",
+        }
+    }
+
+# opencourse.core.cache: entries kept in each process, and for how long
+TIERED_CACHE_L1_SIZE = env.int("DJANGO_TIERED_CACHE_L1_SIZE", 1000)
+TIERED_CACHE_L1_TTL = 5
+# Seconds a namespace version is trusted before being read again
+TIERED_CACHE_VERSION_TTL = 1
+# Seconds a stale value may be served while it is being recomputed
+TIERED_CACHE_GRACE = 60
+TIERED_CACHE_LOCK_TIMEOUT = 10
 
 
 # Password validation
@@ -142,11 +204,96 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [str(BASE_DIR("opencourse/static"))]
 STATIC_ROOT = str(BASE_DIR("static"))
 
+# Concatenated and minified by collectstatic, see opencourse.core.storage
+STATIC_BUNDLES = {
+    "bundles/site.css": [
+        "vendor/skillhunt/css/open-iconic-bootstrap.min.css",
+        "vendor/skillhunt/css/animate.css",
+        "vendor/skillhunt/css/owl.carousel.min.css",
+        "vendor/skillhunt/css/owl.theme.default.min.css",
+        "vendor/skillhunt/css/magnific-popup.css",
+        "vendor/skillhunt/css/aos.css",
+        "vendor/skillhunt/css/ionicons.min.css",
+        "vendor/skillhunt/css/bootstrap-datepicker.css",
+        "vendor/skillhunt/css/jquery.timepicker.css",
+        "vendor/skillhunt/css/flaticon.css",
+        "vendor/skillhunt/css/icomoon.css",
+        "vendor/skillhunt/css/style.css",
+        "vendor/bootstrap-select/bootstrap-select.min.css",
+        "vendor/bootstrap-star-rating/css/star-rating.css",
+        "vendor/bootstrap-star-rating/themes/krajee-uni/theme.css",
+        "css/main.css",
+    ],
+    "bundles/vendor.js": [
+        "vendor/skillhunt/js/jquery.min.js",
+        "vendor/skillhunt/js/jquery-migrate-3.0.1.min.js",
+        "vendor/skillhunt/js/popper.min.js",
+        "vendor/skillhunt/js/bootstrap.min.js",
+        "vendor/skillhunt/js/jquery.easing.1.3.js",
+        "vendor/skillhunt/js/jquery.waypoints.min.js",
+        "vendor/skillhunt/js/jquery.stellar.min.js",
+        "vendor/skillhunt/js/owl.carousel.min.js",
+        "vendor/skillhunt/js/jquery.magnific-popup.min.js",
+        "vendor/skillhunt/js/aos.js",
+        "vendor/skillhunt/js/jquery.animateNumber.min.js",
+        "vendor/skillhunt/js/scrollax.min.js",
+        "vendor/skillhunt/js/main.js",
+        "vendor/bootstrap-select/bootstrap-select.min.js",
+        "vendor/bootstrap-star-rating/js/star-rating.js",
+        "vendor/bootstrap-star-rating/themes/krajee-uni/theme.js",
+    ],
+}
+STATIC_BUNDLES_ENABLED = env.bool("DJANGO_STATIC_BUNDLES", default=False)
+# Written by compilejsi18n, collected with the other static files
+JS_CATALOG_DIR = str(BASE_DIR("opencourse/static/jsi18n"))
+JS_CATALOG_STATIC = env.bool("DJANGO_JS_CATALOG_STATIC", default=False)
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = str(BASE_DIR("media"))
 
 # Project adjustments
 AUTH_USER_MODEL = "profiles.User"
+
+# Chunked handout uploads are assembled here before being moved to MEDIA_ROOT
+HANDOUT_UPLOAD_DIR = env.str(
+    "DJANGO_HANDOUT_UPLOAD_DIR", default=str(BASE_DIR("tmp", "uploads"))
+)
+HANDOUT_UPLOAD_CHUNK_SIZE = env.int("DJANGO_HANDOUT_UPLOAD_CHUNK_SIZE", 5 * 1024 ** 2)
+HANDOUT_UPLOAD_MAX_SIZE = env.int("DJANGO_HANDOUT_UPLOAD_MAX_SIZE", 1024 ** 3)
+HANDOUT_UPLOAD_BLOCK_SIZE = 64 * 1024
+
+# Square renditions generated for every profile and center picture, in px
+IMAGE_RENDITION_SIZES = [48, 96, 180, 360]
+IMAGE_RENDITION_FORMATS = ["webp", "jpeg"]
+IMAGE_RENDITION_QUALITY = 80
+# Uploads larger than this are refused before their pixels are decoded
+IMAGE_MAX_PIXELS = env.int("DJANGO_IMAGE_MAX_PIXELS", 40_000_000)
+# Concurrency of the processimages worker pool
+IMAGE_WORKERS = env.int("DJANGO_IMAGE_WORKERS", 2)
+# What to do when a view exceeds its query_budget: "warn", "raise" (set by
+# config.settings.test) or "" to not record queries at all
+QUERY_BUDGET_ACTION = env.str("DJANGO_QUERY_BUDGET_ACTION", default="")
+# Shared by the processes of a server to sum their metrics, emptied at start
+METRICS_DIR = env.str("DJANGO_METRICS_DIR", default="")
+METRICS_FLUSH_INTERVAL = 5
+# Bearer token of the scraper; staff users can read /metrics/ too
+METRICS_TOKEN = env.str("DJANGO_METRICS_TOKEN", default="")
+# Folded stacks of the requests profiled with ?_profile, and seconds between
+# two samples
+PROFILE_DIR = env.str("DJANGO_PROFILE_DIR", default=str(BASE_DIR("tmp", "profiles")))
+PROFILE_INTERVAL = 0.005
+# Queries slower than this many milliseconds are logged, explained and
+# aggregated in the SlowQuery table; 0 disables the capture
+SLOW_QUERY_THRESHOLD = env.int("DJANGO_SLOW_QUERY_THRESHOLD", 500)
+# Above this many rows by the planner's estimate, EstimatedCountPaginator
+# shows the estimate instead of running COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = env.int("DJANGO_ESTIMATED_COUNT_THRESHOLD", 10000)
+# Rows counted at most by ApproximateCountPaginator, beyond which search
+# results show "about N" or "N+" results and no last page
+APPROXIMATE_COUNT_THRESHOLD = env.int("DJANGO_APPROXIMATE_COUNT_THRESHOLD", 1000)
+# Limits of the course import form, larger files go through importcourses
+COURSE_IMPORT_MAX_SIZE = env.int("DJANGO_COURSE_IMPORT_MAX_SIZE", 2 * 1024 ** 2)
+COURSE_IMPORT_MAX_ROWS = env.int("DJANGO_COURSE_IMPORT_MAX_ROWS", 1000)
 admins_data = env.tuple(
     "DJANGO_ADMINS", default="Open Course <opencourse2020@mail.com>"
 )
@@ -22,6 +22,7 @@ ROSETTA_ENABLE_TRANSLATION_SUGGESTIONS = True
 YANDEX_TRANSLATE_KEY = env.str("DJANGO_YANDEX_TRANSLATE_KEY", None)
 
 ACCOUNT_EMAIL_VERIFICATION = "none"
+QUERY_BUDGET_ACTION = "warn"
 
 ADMINS = (
     ("Admin", "admin@gmail.com"),
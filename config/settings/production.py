@@ -26,6 +26,13 @@ SECURE_BROWSER_XSS_FILTER = True
 INSTALLED_APPS += [
     # "django_extensions",
 ]
+MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")
+
+# Bundled, fingerprinted and precompressed static files, served by whitenoise
+# with immutable cache headers
+STATICFILES_STORAGE = "opencourse.core.storage.BundledStaticFilesStorage"
+STATIC_BUNDLES_ENABLED = True
+JS_CATALOG_STATIC = True
 
 log_filename = str(BASE_DIR("logs", "opencourse.log"))
 os.makedirs(os.path.dirname(log_filename), exist_ok=True)
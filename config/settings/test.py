@@ -0,0 +1,8 @@
+"""Settings of the test suite, used by pytest (see pytest.ini)."""
+from .base import *  # noqa
+
+# Views exceeding their query_budget fail the test
+QUERY_BUDGET_ACTION = "raise"
+# The background writes of the slow query capture would race the test
+# transactions
+SLOW_QUERY_THRESHOLD = 0
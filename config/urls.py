@@ -29,6 +29,7 @@ urlpatterns = [
     path("jsi18n/", JavaScriptCatalog.as_view(), name="javascript-catalog"),
     path("i18n/", include("django.conf.urls.i18n")),
     path("courses/", include("opencourse.courses.urls", namespace="courses")),
+    path("", include("opencourse.core.urls", namespace="core")),
     path("", RedirectView.as_view(pattern_name="courses:search")),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
@@ -0,0 +1,67 @@
+from django.contrib import admin
+from django.db.models import CASCADE, PROTECT
+
+from .deletion import relations, schedule_deletion
+from .models import DeletionJob
+from .paginator import EstimatedCountPaginator
+
+
+class LargeTableAdmin:
+    """Changelist options for tables of millions of rows: no COUNT(*) over
+    the whole table, nor over the filtered rows when they are many.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class BackgroundDeleteAdmin:
+    """Hide the deleted objects, their deletion with the cascade being left to
+    rundeletions, so neither the confirmation nor the deletion collects it.
+
+    The confirmation checks the delete permission on every model of the
+    cascade, and lists the objects protecting it, up to ``protected_shown``
+    per relation.
+    """
+
+    protected_shown = 10
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        pks = [obj.pk for obj in objs]
+        cascade, protected = {self.model}, []
+        for model, lookup, on_delete in relations(self.model):
+            if on_delete is CASCADE:
+                cascade.add(model)
+            elif on_delete is PROTECT:
+                rows = model._base_manager.filter(**{f"{lookup}__in": pks})
+                protected += [str(obj) for obj in rows[: self.protected_shown]]
+        perms_needed = set()
+        for model in cascade:
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin and not model_admin.has_delete_permission(request):
+                perms_needed.add(model._meta.verbose_name)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            perms_needed,
+            protected,
+        )
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ["object_repr", "content_type", "status", "deleted", "updated"]
+    list_filter = ["status"]
+    readonly_fields = ["content_type", "object_id", "object_repr", "deleted", "error"]
+
+    def has_add_permission(self, request):
+        # Jobs are queued by deletions
+        return False
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.utils.translation import ugettext_lazy as _
+
+
+class CoreConfig(AppConfig):
+    name = "opencourse.core"
+    verbose_name = _("Core")
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import slowqueries
+
+        connection_created.connect(slowqueries.install)
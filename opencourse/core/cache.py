@@ -0,0 +1,263 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .instrumentation import add_timing
+from .metrics import CACHE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "tiered-cache:invalidate"
+MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe LRU cache bounded to ``maxsize`` entries."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (MISSING, 0))
+            if value is MISSING:
+                return MISSING
+            if expires <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """A per-process LRU (L1) in front of a shared Django cache (L2).
+
+    Keys live in namespaces. Bumping a namespace version with ``invalidate()``
+    makes every key of the namespace unreachable in all processes: the new
+    version is published on redis when the shared cache is django-redis, and
+    otherwise noticed within ``TIERED_CACHE_VERSION_TTL`` seconds.
+
+    Values are fresh for ``timeout`` seconds and then stale for ``grace`` more
+    seconds. A stale value is recomputed by a single caller, holding a lock in
+    the shared cache, while the other callers keep getting the stale value.
+    """
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+        self.local = LocalCache(settings.TIERED_CACHE_L1_SIZE)
+        self.counters = Counter()
+        self._counters_lock = threading.Lock()
+        self._versions = {}
+        self._subscribed_pid = None
+        self._subscribe_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def call(self, method, *args):
+        """Call the shared cache, timing the round trip."""
+        start = time.perf_counter()
+        try:
+            return getattr(self.shared, method)(*args)
+        finally:
+            add_timing("cache", time.perf_counter() - start)
+
+    def get_or_set(self, key, compute, timeout, grace=None, namespace="default"):
+        if grace is None:
+            grace = settings.TIERED_CACHE_GRACE
+        key = self.make_key(key, namespace)
+        now = time.time()
+
+        entry = self.local.get(key)
+        if entry is not MISSING:
+            self.count("l1_hits")
+            return entry[0]
+
+        entry = self.call("get", key)
+        if entry is not None:
+            value, fresh_until = entry
+            if now < fresh_until:
+                self.count("l2_hits")
+                self.store_local(key, entry, fresh_until - now)
+                return value
+            if self.acquire(key):
+                self.count("stale_refreshes")
+                return self.refresh(key, compute, timeout, grace)
+            self.count("stale_hits")
+            return value
+
+        self.count("misses")
+        if not self.acquire(key):
+            entry = self.wait(key)
+            if entry is not None:
+                return entry[0]
+            self.count("lock_timeouts")
+        return self.refresh(key, compute, timeout, grace)
+
+    def get(self, key, default=None, namespace="default"):
+        key = self.make_key(key, namespace)
+        entry = self.local.get(key)
+        if entry is MISSING:
+            entry = self.call("get", key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, timeout, grace=None, namespace="default"):
+        if grace is None:
+            grace = settings.TIERED_CACHE_GRACE
+        key = self.make_key(key, namespace)
+        entry = (value, time.time() + timeout)
+        self.call("set", key, entry, timeout + grace)
+        self.store_local(key, entry, timeout)
+
+    def refresh(self, key, compute, timeout, grace):
+        try:
+            value = compute()
+            entry = (value, time.time() + timeout)
+            self.call("set", key, entry, timeout + grace)
+            self.store_local(key, entry, timeout)
+            return value
+        finally:
+            self.call("delete", self.lock_key(key))
+
+    def store_local(self, key, entry, timeout):
+        self.local.set(key, entry, min(timeout, settings.TIERED_CACHE_L1_TTL))
+
+    def lock_key(self, key):
+        return f"{key}:lock"
+
+    def acquire(self, key):
+        added = self.call(
+            "add", self.lock_key(key), os.getpid(), settings.TIERED_CACHE_LOCK_TIMEOUT
+        )
+        # django-redis returns None instead of raising when redis is down:
+        # nobody can hold the lock then, compute rather than wait for it
+        return added is not False
+
+    def wait(self, key):
+        """Wait for the lock holder to store ``key``."""
+        self.count("lock_waits")
+        deadline = time.monotonic() + settings.TIERED_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self.call("get", key)
+            if entry is not None:
+                return entry
+            if self.acquire(key):
+                return None
+        return None
+
+    def make_key(self, key, namespace):
+        return f"tc:{namespace}:{self.version(namespace)}:{key}"
+
+    def version_key(self, namespace):
+        return f"tc:version:{namespace}"
+
+    def version(self, namespace):
+        self.subscribe()
+        now = time.monotonic()
+        version, checked = self._versions.get(namespace, (None, 0))
+        if version is not None and now - checked < settings.TIERED_CACHE_VERSION_TTL:
+            return version
+        key = self.version_key(namespace)
+        version = self.call("get", key)
+        if version is None:
+            # Start from the clock, so that a lost version key can't bring
+            # back the entries of an earlier version
+            self.call("add", key, int(time.time() * 1000), None)
+            version = self.call("get", key)
+        self._versions[namespace] = (version, now)
+        return version
+
+    def invalidate(self, namespace="default"):
+        key = self.version_key(namespace)
+        try:
+            self.call("incr", key)
+        except ValueError:
+            self.call("add", key, int(time.time() * 1000), None)
+        self._versions.pop(namespace, None)
+        self.count("invalidations")
+        connection = self.redis()
+        if connection is None:
+            return
+        try:
+            connection.publish(CHANNEL, namespace)
+        except Exception:
+            logger.warning("Cannot publish the invalidation of %s", namespace)
+
+    def redis(self):
+        try:
+            from django_redis import get_redis_connection
+
+            return get_redis_connection(self.alias)
+        except (ImportError, NotImplementedError):
+            return None
+
+    def subscribe(self):
+        """Listen for invalidations of other processes, once per process."""
+        pid = os.getpid()
+        if self._subscribed_pid == pid:
+            return
+        with self._subscribe_lock:
+            if self._subscribed_pid == pid:
+                return
+            self._subscribed_pid = pid
+            self._versions.clear()
+            self.local.clear()
+            connection = self.redis()
+            if connection is None:
+                return
+            try:
+                pubsub = connection.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{CHANNEL: self.on_invalidate})
+                pubsub.run_in_thread(sleep_time=1, daemon=True)
+            except Exception:
+                logger.warning(
+                    "Cannot subscribe to cache invalidations, polling versions",
+                    exc_info=True,
+                )
+
+    def on_invalidate(self, message):
+        namespace = message["data"]
+        if isinstance(namespace, bytes):
+            namespace = namespace.decode()
+        self._versions.pop(namespace, None)
+
+    def count(self, name):
+        with self._counters_lock:
+            self.counters[name] += 1
+        CACHE_EVENTS.inc(event=name)
+
+    def stats(self):
+        with self._counters_lock:
+            stats = dict(self.counters)
+        hits = stats.get("l1_hits", 0) + stats.get("l2_hits", 0)
+        lookups = hits + stats.get("misses", 0) + stats.get("stale_hits", 0)
+        lookups += stats.get("stale_refreshes", 0)
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        stats["l1_size"] = len(self.local)
+        return stats
+
+
+tiered_cache = TieredCache()
@@ -0,0 +1,66 @@
+import threading
+from collections import Counter
+
+from ..metrics import DB_CONNECTIONS
+
+
+class ConnectionStats:
+    """Per-process counts of opened, reused and dropped connections."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, alias, event):
+        with self._lock:
+            self.counters[alias, event] += 1
+        DB_CONNECTIONS.inc(alias=alias, event=event)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+
+
+connection_stats = ConnectionStats()
+
+
+class HealthCheckMixin:
+    """Check a persistent connection before its first use in a request.
+
+    Django only drops a kept connection after an error occurred on it, so a
+    connection closed by the server or a pooler while idle would fail the
+    first query of the next request.
+    """
+
+    health_check_done = False
+
+    def connect(self):
+        self.health_check_done = True
+        super().connect()
+        connection_stats.count(self.alias, "opened")
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            self.health_check_done = True
+            if self.is_usable():
+                connection_stats.count(self.alias, "reused")
+            else:
+                connection_stats.count(self.alias, "unusable")
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs at the start and the end of every request. It reads the
+        # autocommit state through ensure_connection(), which mustn't count
+        # as the first use.
+        self.health_check_done = True
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
@@ -0,0 +1,49 @@
+from django.contrib.postgres import operations
+from django.db.migrations import AddIndex, RunSQL
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """Build the index without locking writes to the table on PostgreSQL,
+    and as a plain AddIndex on other databases.
+
+    Migrations using it must set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddUpperIndexConcurrently(RunSQL):
+    """Index ``UPPER(column)`` for the case-insensitive lookups of the admin
+    search (``^field`` and ``=field``), on PostgreSQL only.
+
+    Django 3.0 indexes can't hold expressions. The ``text_pattern_ops``
+    operator class serves LIKE 'PREFIX%' whatever the collation, and equality.
+    Migrations using it must set ``atomic = False``.
+    """
+
+    def __init__(self, table, column, name):
+        super().__init__(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+            f'ON "{table}" (UPPER("{column}"::text) text_pattern_ops)',
+            f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"',
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
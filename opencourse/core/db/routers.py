@@ -0,0 +1,84 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_state = threading.local()
+
+
+@contextmanager
+def use_replicas():
+    """Send the reads of the block to the replicas, until a write happens."""
+    _state.replicas, _state.wrote = True, False
+    try:
+        yield
+    finally:
+        _state.replicas = False
+
+
+def wrote():
+    return getattr(_state, "wrote", False)
+
+
+class PrimaryReplicaRouter:
+    """Route reads to a random replica inside ``use_replicas()`` blocks.
+
+    Everything else uses the primary: writes, reads following a write, reads
+    inside a transaction, and code running outside of requests.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.DATABASE_REPLICAS
+            and getattr(_state, "replicas", False)
+            and not wrote()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Read from the replicas during safe requests.
+
+    A client that wrote gets a cookie keeping its reads on the primary for
+    ``REPLICA_STICKY_SECONDS``, so it sees its own writes despite the
+    replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        if (
+            request.method in SAFE_METHODS
+            and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+        ):
+            with use_replicas():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        if wrote():
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
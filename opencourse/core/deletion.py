@@ -0,0 +1,110 @@
+"""Deletion of objects with large cascades, in the background.
+
+Deleting a professor, a center or a course removes thousands of rows through
+the cascade, which is too long for a request. ``schedule_deletion`` hides the
+object instead, the default managers leaving hidden objects out, and queues a
+DeletionJob. ``rundeletions`` then deletes the rows depending on the object
+in batches, leaves first, each batch in a short transaction.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import CASCADE, SET_NULL
+from django.db.models.deletion import get_candidate_relations_to_delete
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from .models import DeletionJob
+
+
+@transaction.atomic
+def schedule_deletion(obj):
+    """Hide ``obj``, and the objects in its ``hidden_with`` related managers,
+    and queue its deletion.
+    """
+    model = type(obj)
+    model._base_manager.filter(pk=obj.pk).update(hidden=True)
+    for name in getattr(model, "hidden_with", ()):
+        getattr(obj, name).update(hidden=True)
+    return DeletionJob.objects.create(
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=obj.pk,
+        object_repr=str(obj)[:200],
+    )
+
+
+def relations(model, lookup="pk", path=()):
+    """Yield (model, lookup, on_delete) for the foreign keys to the rows of
+    ``model``, and to the rows cascading from them, ``lookup`` leading from
+    each model to the primary key of the deleted rows.
+    """
+    path += (model,)
+    for relation in get_candidate_relations_to_delete(model._meta):
+        field = relation.field
+        related_lookup = f"{field.name}__{lookup}"
+        on_delete = field.remote_field.on_delete
+        yield relation.related_model, related_lookup, on_delete
+        if on_delete is CASCADE and relation.related_model not in path:
+            yield from relations(relation.related_model, related_lookup, path)
+
+
+class Cascade:
+    """Delete rows with the rows depending on them, ``batch_size`` at a time.
+
+    The dependent rows are deleted or updated first, following the on_delete
+    of their foreign keys, so the final delete of each batch has nothing left
+    to collect. Files are released by the post_delete receivers of their
+    models once the batch is committed, and the object permissions of the
+    rows are deleted along.
+    ``progress`` is called with the number of rows deleted after each batch.
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.deleted = 0
+
+    def batches(self, queryset):
+        queryset = queryset.order_by("pk").values_list("pk", flat=True)
+        while True:
+            pks = list(queryset[: self.batch_size])
+            if not pks:
+                return
+            yield pks
+
+    def delete(self, queryset):
+        for pks in self.batches(queryset):
+            self.delete_batch(queryset.model, pks)
+
+    def update(self, queryset, **values):
+        for pks in self.batches(queryset.exclude(**values)):
+            queryset.model._base_manager.filter(pk__in=pks).update(**values)
+
+    def delete_batch(self, model, pks):
+        for relation in get_candidate_relations_to_delete(model._meta):
+            field = relation.field
+            related = relation.related_model._base_manager.filter(
+                **{f"{field.name}__in": pks}
+            )
+            if field.remote_field.on_delete is CASCADE:
+                self.delete(related)
+            elif field.remote_field.on_delete is SET_NULL:
+                self.update(related, **{field.name: None})
+            # Other rules, such as PROTECT, are left to the final delete
+
+        # Object permissions refer to their object by a generic foreign key
+        content_type = ContentType.objects.get_for_model(model)
+        object_pks = [str(pk) for pk in pks]
+        for permission_model in (UserObjectPermission, GroupObjectPermission):
+            permissions = permission_model.objects.filter(
+                content_type=content_type, object_pk__in=object_pks
+            )
+            for permission_pks in self.batches(permissions):
+                self.delete_rows(permission_model, permission_pks)
+
+        self.delete_rows(model, pks)
+
+    def delete_rows(self, model, pks):
+        with transaction.atomic():
+            deleted, _ = model._base_manager.filter(pk__in=pks).delete()
+        self.deleted += deleted
+        if self.progress:
+            self.progress(self.deleted)
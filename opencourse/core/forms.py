@@ -0,0 +1,97 @@
+import hashlib
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.forms.models import ModelChoiceIterator
+from django.utils.translation import get_language
+from django.utils.translation import ugettext_lazy as _
+
+from .cache import tiered_cache
+
+
+class PictureField(forms.ImageField):
+    """Image upload refused above ``IMAGE_MAX_PIXELS``.
+
+    Only the header is read and verified here, the pixels are decoded by the
+    ``processimages`` workers rather than in the request.
+    """
+
+    default_error_messages = {
+        "too_large": _("The picture must not exceed %(pixels)s pixels."),
+    }
+
+    def to_python(self, data):
+        f = super().to_python(data)
+        if f is not None:
+            width, height = f.image.size
+            if width * height > settings.IMAGE_MAX_PIXELS:
+                raise ValidationError(
+                    self.error_messages["too_large"],
+                    code="too_large",
+                    params={"pixels": settings.IMAGE_MAX_PIXELS},
+                )
+        return f
+
+
+def choices_namespace(model):
+    return f"choices:{model._meta.label_lower}"
+
+
+def invalidate_choices(sender, **kwargs):
+    tiered_cache.invalidate(choices_namespace(sender))
+
+
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self.field.cached_choices()
+
+    def __len__(self):
+        return len(self.field.cached_choices()) + (self.field.empty_label is not None)
+
+
+class CachedChoicesMixin:
+    """Render the choices of a model choice field from the tiered cache.
+
+    Choices are cached per queryset and language, and invalidated when an
+    object of the model is saved or deleted. Submitted values are still looked
+    up in the database.
+    """
+
+    iterator = CachedModelChoiceIterator
+    choices_timeout = 300
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(queryset, **kwargs)
+        for signal in (post_save, post_delete):
+            signal.connect(
+                invalidate_choices,
+                sender=queryset.model,
+                dispatch_uid=choices_namespace(queryset.model),
+            )
+
+    def cached_choices(self):
+        query = str(self.queryset.query).encode()
+        key = "{}:{}".format(get_language(), hashlib.md5(query).hexdigest())
+        return tiered_cache.get_or_set(
+            key,
+            lambda: [
+                (self.prepare_value(obj), self.label_from_instance(obj))
+                for obj in self.queryset.all()
+            ],
+            self.choices_timeout,
+            namespace=choices_namespace(self.queryset.model),
+        )
+
+
+class CachedModelChoiceField(CachedChoicesMixin, forms.ModelChoiceField):
+    pass
+
+
+class CachedModelMultipleChoiceField(
+    CachedChoicesMixin, forms.ModelMultipleChoiceField
+):
+    pass
@@ -0,0 +1,145 @@
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+# Models whose picture field holds the uploads the renditions are made from
+PICTURE_MODELS = ("courses.Center", "profiles.Professor", "profiles.Student")
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+def rendition_name(name, size, fmt):
+    """Deterministic storage name of a square ``size`` px rendition of ``name``."""
+    root, _ = os.path.splitext(name)
+    return f"renditions/{root}.{size}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def rendition_size(size):
+    """Smallest configured rendition covering ``size`` px, or the largest one."""
+    sizes = sorted(settings.IMAGE_RENDITION_SIZES)
+    return next((s for s in sizes if s >= size), sizes[-1])
+
+
+def renditions(name):
+    for size in settings.IMAGE_RENDITION_SIZES:
+        for fmt in settings.IMAGE_RENDITION_FORMATS:
+            yield size, fmt, rendition_name(name, size, fmt)
+
+
+def has_renditions(fieldfile):
+    # Renditions are written in order, the last one exists only once all do.
+    *_, (_, _, last) = renditions(fieldfile.name)
+    return fieldfile.storage.exists(last)
+
+
+def open_picture(f):
+    """Open the picture ``f`` reading its header only.
+
+    Raise ``Image.DecompressionBombError`` above ``IMAGE_MAX_PIXELS``, before
+    anything is decoded.
+    """
+    image = Image.open(f)
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise Image.DecompressionBombError(
+            f"{width}x{height} px exceeds the limit of {settings.IMAGE_MAX_PIXELS}"
+        )
+    return image
+
+
+def generate_renditions(name, storage=default_storage):
+    """Write every missing rendition of the uploaded picture ``name``.
+
+    The picture is rotated according to its EXIF orientation and cropped to a
+    square, since it is only displayed as an avatar. EXIF and other metadata are
+    not copied to the renditions.
+    """
+    missing = [r for r in renditions(name) if not storage.exists(r[2])]
+    if not missing:
+        return
+    with storage.open(name, "rb") as f:
+        image = open_picture(f)
+        image.draft("RGB", (max(settings.IMAGE_RENDITION_SIZES),) * 2)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    for size, fmt, rendition in missing:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        output = BytesIO()
+        thumbnail.save(
+            output,
+            FORMATS[fmt][0],
+            quality=settings.IMAGE_RENDITION_QUALITY,
+            optimize=True,
+        )
+        storage.save(rendition, ContentFile(output.getvalue()))
+
+
+def enqueue_renditions(fieldfile):
+    """Queue the renditions of ``fieldfile`` for the ``processimages`` workers.
+
+    Called when the picture changes only. The job of an earlier picture stored
+    under the same name is started over.
+    """
+    if not fieldfile or has_renditions(fieldfile):
+        return
+    ImageJob = apps.get_model("core", "ImageJob")
+    ImageJob.objects.update_or_create(
+        name=fieldfile.name,
+        defaults={"status": ImageJob.PENDING, "attempts": 0, "error": ""},
+    )
+
+
+def replace_picture(instance, update_fields=None):
+    """Return whether saving ``instance`` changes its picture.
+
+    Called before the save; the replaced picture and its renditions are deleted
+    once the save is committed.
+    """
+    if update_fields is not None and "picture" not in update_fields:
+        return False
+    name = instance.picture.name or ""
+    if instance._state.adding:
+        return bool(name)
+    previous = (
+        type(instance)
+        ._base_manager.filter(pk=instance.pk)
+        .values_list("picture", flat=True)
+        .first()
+    )
+    if (previous or "") == name:
+        return False
+    if previous:
+        storage = instance.picture.storage
+        transaction.on_commit(lambda: delete_picture(previous, storage))
+    return True
+
+
+def delete_picture(name, storage=default_storage):
+    """Delete the uploaded picture ``name``, its renditions and its job.
+
+    The name is free for a later upload once the picture is deleted.
+    """
+    if not name:
+        return
+    for _, _, rendition in renditions(name):
+        storage.delete(rendition)
+    storage.delete(name)
+    apps.get_model("core", "ImageJob").objects.filter(name=name).delete()
+
+
+def discard_picture(name, storage=default_storage):
+    """Unset the picture ``name`` that failed to decode and delete the file.
+
+    The job is kept to record the error.
+    """
+    for label in PICTURE_MODELS:
+        apps.get_model(label)._base_manager.filter(picture=name).update(picture="")
+    storage.delete(name)
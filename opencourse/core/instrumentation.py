@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_request = threading.local()
+
+
+def current_view():
+    """Name of the view handling the current request, if any."""
+    return getattr(_request, "view", None)
+
+
+def add_timing(name, seconds):
+    """Add to the ``name`` entry of the current request's Server-Timing."""
+    totals = getattr(_request, "totals", None)
+    if totals is not None:
+        totals[name] = totals.get(name, 0) + seconds
+
+
+class QueryCounter:
+    """Count the queries run on every database connection while active."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - start)
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.time += duration
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+class QueryRecorder(QueryCounter):
+    """Also keep the SQL of the queries.
+
+    >>> with QueryRecorder() as recorder:
+    ...     list(Course.objects.all())
+    >>> recorder.count, recorder.duplicates, recorder.time
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+
+    def record(self, sql, duration):
+        super().record(sql, duration)
+        self.queries.append((sql, duration))
+
+    @property
+    def duplicates(self):
+        """Number of queries whose SQL, parameters aside, already ran."""
+        counts = Counter(sql for sql, duration in self.queries)
+        return sum(count - 1 for count in counts.values())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudget:
+    """Limits for a single request, declared on a view class:
+
+        class CourseDetailView(DetailView):
+            query_budget = QueryBudget(queries=12, duplicates=2)
+
+    ``db_time`` and ``time`` are in milliseconds. Unset limits aren't checked.
+    """
+
+    def __init__(self, queries=None, duplicates=None, db_time=None, time=None):
+        self.queries = queries
+        self.duplicates = duplicates
+        self.db_time = db_time
+        self.time = time
+
+    def violations(self, recorder, elapsed):
+        measures = (
+            ("queries", self.queries, recorder.count),
+            ("duplicate queries", self.duplicates, recorder.duplicates),
+            ("ms in the database", self.db_time, recorder.time * 1000),
+            ("ms", self.time, elapsed * 1000),
+        )
+        return [
+            f"{value:.0f} {name} > {limit}"
+            for name, limit, value in measures
+            if limit is not None and value > limit
+        ]
+
+
+class QueryBudgetMiddleware:
+    """Check every request against the ``query_budget`` of its view class.
+
+    Exceeded budgets are logged when ``QUERY_BUDGET_ACTION`` is "warn" and
+    raise QueryBudgetExceeded when it is "raise", as in the test suite.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET_ACTION:
+            return self.get_response(request)
+        start = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        request.query_recorder = recorder
+
+        view_class = getattr(request, "view_class", None)
+        budget = getattr(view_class, "query_budget", None)
+        if budget is None:
+            return response
+        violations = budget.violations(recorder, elapsed)
+        if violations:
+            message = "{} ({}) exceeded its query budget: {}".format(
+                view_class.__name__, request.path, ", ".join(violations)
+            )
+            if settings.QUERY_BUDGET_ACTION == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_class = getattr(view_func, "view_class", None)
+
+
+class MetricsMiddleware:
+    """Feed the request, database and template metrics of every request, and
+    break its time down in a Server-Timing header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.registry.check_fork()
+        _request.totals = totals = {}
+        start = time.perf_counter()
+        try:
+            with QueryCounter() as counter:
+                response = self.get_response(request)
+        finally:
+            _request.totals = _request.view = None
+        elapsed = time.perf_counter() - start
+
+        view = self.view_name(request)
+        metrics.REQUESTS.inc(
+            view=view, method=request.method, status=response.status_code
+        )
+        metrics.REQUEST_LATENCY.observe(elapsed, view=view)
+        metrics.DB_QUERIES.inc(counter.count, view=view)
+        metrics.DB_QUERY_TIME.inc(counter.time, view=view)
+        metrics.registry.flush()
+
+        timings = [f'db;dur={counter.time * 1000:.1f};desc="{counter.count} queries"']
+        timings += [
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items()
+        ]
+        timings.append(f"total;dur={elapsed * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _request.view = self.view_name(request)
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def rendered(response):
+            duration = time.perf_counter() - start
+            add_timing("template", duration)
+            metrics.TEMPLATE_LATENCY.observe(duration, view=self.view_name(request))
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def view_name(self, request):
+        match = getattr(request, "resolver_match", None)
+        # Unresolved paths are grouped, to keep the number of series bounded
+        return match.view_name if match else "<unresolved>"
@@ -0,0 +1,72 @@
+"""Compare the cost of database connection handling per request.
+
+Each simulated request sends request_started, runs ``--queries`` queries and
+sends request_finished, like a gunicorn worker serving a view. Three modes
+are timed:
+
+- new: CONN_MAX_AGE = 0, a connection is opened for every request;
+- persistent: CONN_MAX_AGE = --max-age, the connection is kept by the worker
+  and health checked on its first use in each request;
+- the same two modes against a pgbouncer, by pointing DATABASE_URL at it and
+  setting DJANGO_DB_TRANSACTION_POOLING=1.
+
+Run it against the production-like database, e.g.:
+
+    ./manage.py benchmarkconnections --requests 500
+
+Opening a connection costs a TCP round trip, TLS and authentication, while a
+health check costs a single ``SELECT 1``, so "persistent" should take a fixed
+amount off the median request.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from opencourse.core.db.health import connection_stats
+
+
+class Command(BaseCommand):
+    help = "Time request cycles with and without persistent database connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--queries", type=int, default=5)
+        parser.add_argument("--max-age", type=int, default=600)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        max_age = connection.settings_dict["CONN_MAX_AGE"]
+        try:
+            for mode, age in (("new", 0), ("persistent", options["max_age"])):
+                self.run(connection, mode, age, options)
+        finally:
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = max_age
+
+    def run(self, connection, mode, max_age, options):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        connection_stats.reset()
+        timings = []
+        for _ in range(options["requests"]):
+            start = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                for _ in range(options["queries"]):
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        stats = connection_stats.snapshot()
+        self.stdout.write(
+            f"{mode:<12} p50 {statistics.median(timings):.2f}ms "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f}ms "
+            f"opened {stats.get((connection.alias, 'opened'), 0)} "
+            f"reused {stats.get((connection.alias, 'reused'), 0)}"
+        )
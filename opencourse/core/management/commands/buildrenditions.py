@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from opencourse.core.images import generate_renditions
+from opencourse.courses.models import Center
+from opencourse.profiles.models import Professor, Student
+
+
+class Command(BaseCommand):
+    help = "Generate the missing renditions of profile and center pictures."
+
+    def handle(self, *args, **options):
+        for model in (Professor, Student, Center):
+            pictures = (
+                model.objects.exclude(picture="")
+                .exclude(picture=None)
+                .values_list("picture", flat=True)
+            )
+            for name in pictures.iterator():
+                try:
+                    generate_renditions(name)
+                except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+                    self.stderr.write(f"{model.__name__} picture {name}: {e}")
+            self.stdout.write(f"{model.__name__}: done.")
@@ -0,0 +1,26 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpRequest
+from django.utils import translation
+from django.views.i18n import JavaScriptCatalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the JavaScript translation catalog of every language as a static "
+        "file. Run after compilemessages and before collectstatic."
+    )
+
+    def handle(self, *args, **options):
+        os.makedirs(settings.JS_CATALOG_DIR, exist_ok=True)
+        request = HttpRequest()
+        request.method = "GET"
+        for code, name in settings.LANGUAGES:
+            with translation.override(code):
+                response = JavaScriptCatalog.as_view()(request)
+            path = os.path.join(settings.JS_CATALOG_DIR, f"{code}.js")
+            with open(path, "wb") as f:
+                f.write(response.content)
+            self.stdout.write(f"{code}: {path}")
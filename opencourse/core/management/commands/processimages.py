@@ -0,0 +1,113 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from opencourse.core.images import discard_picture, generate_renditions
+from opencourse.core.models import ImageJob
+
+MAX_ATTEMPTS = 3
+STALE_AFTER = timedelta(minutes=10)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate picture renditions queued by uploads, with a bounded pool of "
+        "worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMAGE_WORKERS,
+            help="Number of images processed concurrently.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty."
+        )
+        parser.add_argument(
+            "--poll", type=float, default=2.0, help="Seconds between queue polls."
+        )
+
+    def claim(self, limit):
+        # Jobs left in processing by a worker that died are picked up again.
+        claimable = Q(status=ImageJob.PENDING) | Q(
+            status=ImageJob.PROCESSING, updated__lt=timezone.now() - STALE_AFTER
+        )
+        with transaction.atomic():
+            jobs = list(
+                ImageJob.objects.select_for_update(skip_locked=True)
+                .filter(claimable, attempts__lt=MAX_ATTEMPTS)
+                .order_by("pk")[:limit]
+            )
+            for job in jobs:
+                job.status = ImageJob.PROCESSING
+                job.attempts += 1
+                job.save(update_fields=["status", "attempts", "updated"])
+        return jobs
+
+    def finish(self, job, future):
+        error = future.exception()
+        if error is None:
+            job.status, job.error = ImageJob.DONE, ""
+        else:
+            job.error = repr(error)
+            job.status = (
+                ImageJob.FAILED if job.attempts >= MAX_ATTEMPTS else ImageJob.PENDING
+            )
+            self.stderr.write(f"{job.name}: {job.error}")
+        job.save(update_fields=["status", "error", "updated"])
+        # A broken pool does not tell which of the jobs in flight killed it.
+        if job.status == ImageJob.FAILED and not isinstance(error, BrokenProcessPool):
+            discard_picture(job.name)
+
+    def executor(self, workers):
+        # Spawned children do not inherit the parent's database connections.
+        context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(workers, mp_context=context)
+
+    def submit(self, pool, job):
+        try:
+            return pool.submit(generate_renditions, job.name)
+        except BrokenProcessPool as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        running = {}
+        pool = self.executor(workers)
+        try:
+            while True:
+                for job in self.claim(workers - len(running)):
+                    running[self.submit(pool, job)] = job
+                if not running:
+                    if options["once"]:
+                        return
+                    time.sleep(options["poll"])
+                    continue
+                done, _ = wait(
+                    running, timeout=options["poll"], return_when=FIRST_COMPLETED
+                )
+                broken = False
+                for future in done:
+                    broken |= isinstance(future.exception(), BrokenProcessPool)
+                    self.finish(running.pop(future), future)
+                if broken:
+                    # A killed worker, e.g. out of memory, fails every job in
+                    # flight. They are retried in a new pool.
+                    for future in wait(running).done:
+                        self.finish(running.pop(future), future)
+                    pool.shutdown()
+                    pool = self.executor(workers)
+        finally:
+            pool.shutdown()
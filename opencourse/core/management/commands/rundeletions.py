@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from opencourse.core.deletion import Cascade
+from opencourse.core.models import DeletionJob
+
+STALE_AFTER = timedelta(minutes=10)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the objects hidden by deletions, with everything cascading from "
+        "them, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows deleted per transaction.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty."
+        )
+        parser.add_argument(
+            "--poll", type=float, default=5.0, help="Seconds between queue polls."
+        )
+
+    def claim(self):
+        # Jobs left in processing by a worker that died are picked up again,
+        # a job being updated after every batch while it runs.
+        claimable = Q(status=DeletionJob.PENDING) | Q(
+            status=DeletionJob.PROCESSING, updated__lt=timezone.now() - STALE_AFTER
+        )
+        with transaction.atomic():
+            job = (
+                DeletionJob.objects.select_for_update(skip_locked=True)
+                .filter(claimable)
+                .order_by("pk")
+                .first()
+            )
+            if job is not None:
+                job.status = DeletionJob.PROCESSING
+                job.save(update_fields=["status", "updated"])
+        return job
+
+    def run(self, job, batch_size):
+        def progress(deleted):
+            job.deleted = deleted
+            job.save(update_fields=["deleted", "updated"])
+            self.stdout.write(f"{job.object_repr}: {deleted} row(s) deleted...")
+
+        model = job.content_type.model_class()
+        cascade = Cascade(batch_size, progress)
+        # Resumed jobs keep counting from where they stopped
+        cascade.deleted = job.deleted
+        try:
+            cascade.delete(model._base_manager.filter(pk=job.object_id))
+        except Exception as e:
+            job.status, job.error = DeletionJob.FAILED, repr(e)
+            self.stderr.write(f"{job.object_repr}: {job.error}")
+        else:
+            job.status, job.error = DeletionJob.DONE, ""
+            self.stdout.write(
+                f"{job.object_repr}: done, {cascade.deleted} row(s) deleted."
+            )
+        job.deleted = cascade.deleted
+        job.save(update_fields=["status", "error", "deleted", "updated"])
+
+    def handle(self, *args, **options):
+        while True:
+            job = self.claim()
+            if job is not None:
+                self.run(job, options["batch_size"])
+            elif options["once"]:
+                return
+            else:
+                time.sleep(options["poll"])
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from opencourse.core.models import SlowQuery
+
+ORDERINGS = {"total": "-total_time", "max": "-max_time", "count": "-count"}
+
+
+class Command(BaseCommand):
+    help = "Report the slow queries captured, grouped by normalized SQL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order", choices=ORDERINGS, default="total")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--plans", action="store_true", help="Show the plans.")
+        parser.add_argument(
+            "--clear", action="store_true", help="Forget the captured queries."
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            count, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f"{count} slow queries deleted.")
+            return
+
+        queries = SlowQuery.objects.order_by(ORDERINGS[options["order"]])
+        for query in queries[: options["limit"]]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{query.count} × {query.total_time / query.count:.0f}ms "
+                    f"(max {query.max_time:.0f}ms, total {query.total_time:.0f}ms)"
+                )
+            )
+            self.stdout.write(f"  view: {query.view or '-'}")
+            self.stdout.write(f"  at: {query.location or '-'}")
+            self.stdout.write(f"  {query.sql}")
+            if options["plans"] and query.plan:
+                for line in query.plan.splitlines():
+                    self.stdout.write(f"    {line}")
+            self.stdout.write("")
@@ -0,0 +1,222 @@
+"""In-process counters and histograms, exposed in the Prometheus text format.
+
+Every gunicorn worker keeps its own values. With ``METRICS_DIR`` set, each
+process also dumps them to ``<METRICS_DIR>/<pid>.json`` at most every
+``METRICS_FLUSH_INTERVAL`` seconds, and the metrics endpoint sums the files
+of all processes, including the ones of workers that have exited, so that
+counters never go backwards. The directory must be emptied before the
+server starts.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def merge(self, values, other):
+        raise NotImplementedError
+
+    def samples(self, values):
+        raise NotImplementedError
+
+    def format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{%s}" % ",".join(
+            '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"'))
+            for name, value in pairs
+        )
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, values, other):
+        for key, value in other.items():
+            values[key] = values.get(key, 0) + value
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield self.name + self.format_labels(key), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            # Counts per bucket, the last one being +Inf, then the sum
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def merge(self, values, other):
+        for key, state in other.items():
+            current = values.setdefault(key, [0] * len(state))
+            for i, value in enumerate(state):
+                current[i] += value
+
+    def samples(self, values):
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                labels = self.format_labels(key, [("le", bound)])
+                yield f"{self.name}_bucket{labels}", cumulative
+            yield f"{self.name}_sum{self.format_labels(key)}", state[-1]
+            yield f"{self.name}_count{self.format_labels(key)}", cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.flushed = 0
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def check_fork(self):
+        """Forget the values a forked worker inherited from its parent."""
+        if self.pid != os.getpid():
+            with self.lock:
+                for metric in self.metrics.values():
+                    metric.values = {}
+                self.pid = os.getpid()
+                self.flushed = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: [[list(key), value] for key, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, force=False):
+        """Dump this process's values to the shared directory."""
+        if not settings.METRICS_DIR:
+            return
+        self.check_fork()
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f"{self.pid}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + ".tmp", path)
+
+    def collect(self):
+        """Values of all processes, or of this one without METRICS_DIR."""
+        if not settings.METRICS_DIR:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush(force=True)
+            snapshots = []
+            for filename in os.listdir(settings.METRICS_DIR):
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(settings.METRICS_DIR, filename)
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        values = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, items in snapshot.items():
+                if name in self.metrics:
+                    other = {tuple(key): value for key, value in items}
+                    self.metrics[name].merge(values[name], other)
+        return values
+
+    def render(self):
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for sample, value in metric.samples(values):
+                lines.append(f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+REQUESTS = registry.counter(
+    "django_http_requests_total",
+    "Requests by view, method and response status.",
+    ["view", "method", "status"],
+)
+REQUEST_LATENCY = registry.histogram(
+    "django_http_request_duration_seconds",
+    "Time spent handling requests, by view.",
+    ["view"],
+)
+TEMPLATE_LATENCY = registry.histogram(
+    "django_template_render_duration_seconds",
+    "Time spent rendering template responses, by view.",
+    ["view"],
+)
+DB_QUERIES = registry.counter(
+    "django_db_queries_total", "Database queries, by view.", ["view"]
+)
+DB_QUERY_TIME = registry.counter(
+    "django_db_query_duration_seconds_total",
+    "Time spent in database queries, by view.",
+    ["view"],
+)
+DB_CONNECTIONS = registry.counter(
+    "django_db_connections_total",
+    "Database connections opened, reused or found unusable.",
+    ["alias", "event"],
+)
+CACHE_EVENTS = registry.counter(
+    "opencourse_tiered_cache_events_total",
+    "Tiered cache lookups by outcome (l1_hits, l2_hits, misses, stale_hits...).",
+    ["event"],
+)
@@ -0,0 +1,85 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class ImageJob(models.Model):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, _("Pending")),
+        (PROCESSING, _("Processing")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    )
+
+    name = models.CharField(max_length=255, unique=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Image job")
+        verbose_name_plural = _("Image jobs")
+
+    def __str__(self):
+        return "{} ({})".format(self.name, self.status)
+
+
+class SlowQuery(models.Model):
+    """Queries over SLOW_QUERY_THRESHOLD, aggregated by normalized SQL."""
+
+    fingerprint = models.CharField(max_length=40, unique=True)
+    sql = models.TextField()
+    view = models.CharField(max_length=255, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    plan = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_time = models.FloatField(default=0)
+    max_time = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Slow query")
+        verbose_name_plural = _("Slow queries")
+
+    def __str__(self):
+        return "{} ({})".format(self.sql[:60], self.count)
+
+
+class DeletionJob(models.Model):
+    """Deletion of a hidden object and of everything cascading from it, run
+    in batches by ``rundeletions``.
+    """
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = ImageJob.STATUS_CHOICES
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    object_repr = models.CharField(max_length=200)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    # Rows deleted so far, the object's and the cascaded ones
+    deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Deletion job")
+        verbose_name_plural = _("Deletion jobs")
+
+    def __str__(self):
+        return "{} ({})".format(self.object_repr, self.status)
@@ -0,0 +1,120 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import ugettext_lazy as _
+
+
+def estimate_count(queryset):
+    """Number of rows of ``queryset`` estimated by the PostgreSQL planner, from
+    the table statistics, or None on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "{} {}".format(connection.ops.explain_query_prefix(format="json"), sql),
+            params,
+        )
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Count large querysets with the planner's estimate instead of COUNT(*).
+
+    Below ``ESTIMATED_COUNT_THRESHOLD`` rows the count is exact. Above, the
+    number of pages is approximate and the last ones may be empty.
+    """
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate > settings.ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class ApproximatePage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class ApproximateCountPaginator(Paginator):
+    """Count at most ``APPROXIMATE_COUNT_THRESHOLD`` rows of the object list.
+
+    Below the threshold, the count is exact. Above, it is the planner's
+    estimate when there is one above the threshold, and the threshold itself
+    otherwise, shown as "1000+": ``exact`` and ``estimated`` tell these apart.
+    As the last page is then unknown, pages are fetched with one more row to
+    find out whether there is a next one.
+    """
+
+    threshold = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.threshold is None:
+            self.threshold = settings.APPROXIMATE_COUNT_THRESHOLD
+
+    @cached_property
+    def _count(self):
+        """(count, exact, estimated)"""
+        if not isinstance(self.object_list, QuerySet):
+            return super().count, True, False
+        # COUNT(*) over a LIMIT subquery stops at the threshold
+        count = self.object_list[: self.threshold + 1].count()
+        if count <= self.threshold:
+            return count, True, False
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > self.threshold:
+            return estimate, False, True
+        return self.threshold, False, False
+
+    @property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def exact(self):
+        return self._count[1]
+
+    @property
+    def estimated(self):
+        return self._count[2]
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Pages past the counted rows may still have some
+            if self.exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.exact:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        return ApproximatePage(
+            objects[: self.per_page], number, self, len(objects) > self.per_page
+        )
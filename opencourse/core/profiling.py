@@ -0,0 +1,87 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.text import slugify
+
+PROFILE_FLAG = "_profile"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+
+class Sampler:
+    """Sample the stack of the current thread from a background thread.
+
+    The stacks are counted in the folded format of flamegraph.pl, which
+    speedscope.app also reads: one line per stack, frames from the root,
+    separated by ";", followed by the number of samples.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.fold(frame)] += 1
+
+    def fold(self, frame):
+        names = []
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "?")
+            names.append(f"{module}:{frame.f_code.co_name}".replace(";", ":"))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def folded(self):
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class ProfilingMiddleware:
+    """Profile the requests of staff users carrying the ``_profile`` flag.
+
+    The folded stacks are written to ``PROFILE_DIR`` and linked from the
+    X-Profile response header. Other requests only pay for a GET lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if PROFILE_FLAG not in request.GET or not request.user.is_staff:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with Sampler(settings.PROFILE_INTERVAL) as sampler:
+            response = self.get_response(request)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        name = "{}-{}-{:.0f}ms.folded".format(
+            time.strftime("%Y%m%d-%H%M%S"), slugify(view), elapsed
+        )
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(settings.PROFILE_DIR, name), "w") as f:
+            f.write(sampler.folded())
+        response["X-Profile"] = reverse("core:request_profile", args=[name])
+        return response
@@ -0,0 +1,141 @@
+"""Capture the queries slower than ``SLOW_QUERY_THRESHOLD`` milliseconds.
+
+Every connection gets an execute wrapper timing its queries. A slow query is
+logged with the view and the line of project code that ran it, then handed
+to a background thread which explains it once per fingerprint and adds it
+to the SlowQuery table, away from the request and its transaction.
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import instrumentation
+from .models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(CORE_DIR)
+QUEUE_SIZE = 1000
+
+_queue = queue.Queue(QUEUE_SIZE)
+_worker = {"pid": None}
+_local = threading.local()
+
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+LISTS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so that queries differing by values compare equal."""
+    normalized = STRINGS.sub("?", sql)
+    normalized = NUMBERS.sub("?", normalized)
+    normalized = normalized.replace("%s", "?")
+    normalized = LISTS.sub("(...)", normalized)
+    normalized = SPACES.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest(), normalized
+
+
+def caller():
+    """The innermost frame of project code, core's wrappers and middleware
+    aside."""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(PROJECT_DIR) and not filename.startswith(CORE_DIR):
+            path = os.path.relpath(filename, os.path.dirname(PROJECT_DIR))
+            return f"{path}:{frame.lineno} in {frame.name}"
+    return ""
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        threshold = settings.SLOW_QUERY_THRESHOLD
+        if threshold and duration > threshold:
+            if not getattr(_local, "recording", False):
+                record(context["connection"].alias, sql, params, many, duration)
+
+
+def install(connection, **kwargs):
+    """connection_created receiver."""
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def record(alias, sql, params, many, duration):
+    view = instrumentation.current_view() or ""
+    location = caller()
+    logger.warning("Slow query (%.0fms) in %s at %s: %s", duration, view, location, sql)
+    if _worker["pid"] != os.getpid():
+        _worker["pid"] = os.getpid()
+        threading.Thread(target=work, name="slow-queries", daemon=True).start()
+    try:
+        _queue.put_nowait(
+            (alias, sql, None if many else params, duration, view, location)
+        )
+    except queue.Full:
+        pass
+
+
+def work():
+    _local.recording = True
+    explained = set()
+    while True:
+        alias, sql, params, duration, view, location = _queue.get()
+        try:
+            store(alias, sql, params, duration, view, location, explained)
+        except Exception:
+            logger.exception("Cannot store slow query")
+        finally:
+            close_old_connections()
+
+
+def explain(alias, sql, params):
+    if params is None or not sql.lstrip().upper().startswith("SELECT"):
+        return ""
+    connection = connections[alias]
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {sql}", params)
+        return "\n".join(" ".join(str(column) for column in row) for row in cursor)
+
+
+def store(alias, sql, params, duration, view, location, explained):
+    digest, normalized = fingerprint(sql)
+    values = {"view": view, "location": location, "last_seen": timezone.now()}
+    if digest not in explained:
+        explained.add(digest)
+        values["plan"] = explain(alias, sql, params)
+    updated = SlowQuery.objects.filter(fingerprint=digest).update(
+        count=F("count") + 1,
+        total_time=F("total_time") + duration,
+        max_time=Greatest("max_time", Value(duration)),
+        **values,
+    )
+    if not updated:
+        SlowQuery.objects.get_or_create(
+            fingerprint=digest,
+            defaults=dict(
+                sql=normalized,
+                count=1,
+                total_time=duration,
+                max_time=duration,
+                **values,
+            ),
+        )
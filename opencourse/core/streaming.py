@@ -0,0 +1,70 @@
+import csv
+import itertools
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Spreadsheets run the cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Echo:
+    """File-like object returning what ``csv.writer`` writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def chunked(queryset, size=1000):
+    """Evaluate ``queryset`` in lists of ``size`` objects, by increasing pk.
+
+    Each chunk is a separate query resuming after the last pk, so unlike
+    ``iterator()`` it keeps prefetch_related() working, and unlike slicing it
+    doesn't slow down with the offset.
+    """
+    queryset = queryset.order_by("pk")
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        objects = list(page[:size])
+        if not objects:
+            return
+        yield objects
+        last = objects[-1].pk
+
+
+def csv_lines(rows):
+    """CSV text of ``rows``, the lines of a chunk being joined."""
+    writer = csv.writer(Echo())
+    return "".join(writer.writerow(row) for row in rows)
+
+
+def json_lines(records):
+    """JSON lines of ``records``, one object per line."""
+    return "".join(
+        json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+        for record in records
+    )
+
+
+def as_text(value):
+    """``value`` prefixed with ``'`` if a spreadsheet would run it as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_stream(rows, header=None, size=500):
+    """Yield the CSV text of ``rows``, ``size`` rows at a time.
+
+    Meant to be opened in a spreadsheet, so values that would be run as
+    formulas are escaped with ``as_text()``.
+    """
+    if header:
+        yield csv_lines([header])
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield csv_lines([as_text(value) for value in row] for row in chunk)
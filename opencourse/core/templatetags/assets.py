@@ -0,0 +1,33 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import get_language
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """Include a ``STATIC_BUNDLES`` bundle, or its sources while bundling is off."""
+    paths = [name] if settings.STATIC_BUNDLES_ENABLED else settings.STATIC_BUNDLES[name]
+    if name.endswith(".css"):
+        html = '<link rel="stylesheet" href="{}">'
+    else:
+        html = '<script src="{}"></script>'
+    return format_html_join("\n", html, ((static(path),) for path in paths))
+
+
+@register.simple_tag
+def javascript_catalog():
+    """Include the JavaScript translation catalog of the active language.
+
+    Catalogs written by ``compilejsi18n`` are served as static files when
+    ``JS_CATALOG_STATIC`` is on, instead of being built by a view per request.
+    """
+    if settings.JS_CATALOG_STATIC:
+        url = static(f"jsi18n/{get_language()}.js")
+    else:
+        url = reverse("javascript-catalog")
+    return format_html('<script src="{}"></script>', url)
@@ -0,0 +1,67 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from opencourse.core import images
+
+register = template.Library()
+
+PLACEHOLDER = "images/no-avatar.png"
+
+
+def _url(fieldfile, size, fmt):
+    return fieldfile.storage.url(images.rendition_name(fieldfile.name, size, fmt))
+
+
+def _srcset(fieldfile, size, fmt):
+    sizes = (images.rendition_size(size), images.rendition_size(size * 2))
+    if sizes[0] == sizes[1]:
+        return _url(fieldfile, sizes[0], fmt)
+    return ", ".join(
+        f"{_url(fieldfile, s, fmt)} {density}x" for density, s in enumerate(sizes, 1)
+    )
+
+
+@register.simple_tag
+def rendition_url(fieldfile, size, fmt="jpeg"):
+    """URL of the rendition of ``fieldfile`` sharp at ``size`` CSS px on HiDPI.
+
+    The placeholder avatar is used when there is no picture, and while the
+    renditions of a new upload are still being processed.
+    """
+    if not fieldfile or not images.has_renditions(fieldfile):
+        return static(PLACEHOLDER)
+    return _url(fieldfile, images.rendition_size(size * 2), fmt)
+
+
+@register.simple_tag
+def picture(fieldfile, size, alt="", css_class=""):
+    """``<picture>`` element offering WebP and JPEG renditions for ``size`` px."""
+    if not fieldfile or not images.has_renditions(fieldfile):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" width="{}" height="{}">',
+            rendition_url(fieldfile, size),
+            alt,
+            css_class,
+            size,
+            size,
+        )
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}">',
+        (
+            (images.FORMATS[fmt][1], _srcset(fieldfile, size, fmt))
+            for fmt in images.FORMATS
+            if fmt != "jpeg"
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" alt="{}" class="{}" width="{}" height="{}"></picture>',
+        sources,
+        _url(fieldfile, images.rendition_size(size), "jpeg"),
+        _srcset(fieldfile, size, "jpeg"),
+        alt,
+        css_class,
+        size,
+        size,
+    )
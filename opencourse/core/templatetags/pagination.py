@@ -0,0 +1,13 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, number):
+    """Query string of the current URL with ``page`` set to ``number``, so the
+    filters of search results are kept across pages.
+    """
+    query = context["request"].GET.copy()
+    query["page"] = number
+    return "?" + query.urlencode()
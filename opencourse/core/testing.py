@@ -0,0 +1,16 @@
+import time
+from contextlib import contextmanager
+
+from .instrumentation import QueryBudget, QueryRecorder
+
+
+@contextmanager
+def assert_query_budget(**limits):
+    """Fail when the block exceeds the QueryBudget built from ``limits``."""
+    budget = QueryBudget(**limits)
+    start = time.perf_counter()
+    with QueryRecorder() as recorder:
+        yield recorder
+    violations = budget.violations(recorder, time.perf_counter() - start)
+    if violations:
+        raise AssertionError("Query budget exceeded: " + ", ".join(violations))
@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import views
+
+app_name = "core"
+urlpatterns = [
+    path("metrics/", views.MetricsView.as_view(), name="metrics"),
+    path(
+        "profiling/",
+        views.RequestProfileListView.as_view(),
+        name="request_profile_list",
+    ),
+    path(
+        "profiling/<str:name>",
+        views.RequestProfileView.as_view(),
+        name="request_profile",
+    ),
+]
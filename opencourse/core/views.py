@@ -0,0 +1,55 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.generic import TemplateView, View
+
+from .metrics import registry
+from .profiling import PROFILE_NAME
+
+
+class MetricsView(View):
+    """Metrics of all the server processes, in the Prometheus text format."""
+
+    def get(self, request, *args, **kwargs):
+        authorization = request.META.get("HTTP_AUTHORIZATION", "")
+        token = settings.METRICS_TOKEN
+        if not (
+            request.user.is_staff
+            or (token and constant_time_compare(authorization, f"Bearer {token}"))
+        ):
+            return HttpResponseForbidden()
+        return HttpResponse(
+            registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+class StaffRequiredMixin(UserPassesTestMixin):
+    def test_func(self):
+        return self.request.user.is_staff
+
+
+class RequestProfileListView(StaffRequiredMixin, TemplateView):
+    template_name = "core/profile_list.html"
+
+    def get_context_data(self, **kwargs):
+        try:
+            names = os.listdir(settings.PROFILE_DIR)
+        except FileNotFoundError:
+            names = []
+        kwargs["profiles"] = sorted(
+            (name for name in names if PROFILE_NAME.match(name)), reverse=True
+        )
+        return super().get_context_data(**kwargs)
+
+
+class RequestProfileView(StaffRequiredMixin, View):
+    def get(self, request, name):
+        path = os.path.join(settings.PROFILE_DIR, name)
+        if not PROFILE_NAME.match(name) or not os.path.exists(path):
+            raise Http404
+        return FileResponse(
+            open(path, "rb"), content_type="text/plain; charset=utf-8", filename=name
+        )
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from guardian.admin import GuardedModelAdmin
+from opencourse.core.admin import BackgroundDeleteAdmin, LargeTableAdmin
 from opencourse.courses import models
 
 
@@ -7,26 +8,74 @@ class CourseInline(admin.TabularInline):
     model = models.CourseLocation
 
 
-class CourseAdmin(GuardedModelAdmin):
+@admin.register(models.Course)
+class CourseAdmin(BackgroundDeleteAdmin, LargeTableAdmin, GuardedModelAdmin):
     inlines = [
         CourseInline,
     ]
+    list_display = ["title", "professor", "city", "center", "active"]
+    list_select_related = ["professor__user", "city", "center"]
+    list_filter = ["active"]
+    search_fields = ["^title"]
+    autocomplete_fields = ["professor", "city", "center"]
+    date_hierarchy = "dateexp"
 
 
-model_objects = (
-    models.Course,
+@admin.register(models.Center)
+class CenterAdmin(BackgroundDeleteAdmin, LargeTableAdmin, admin.ModelAdmin):
+    list_display = ["name", "admin", "created"]
+    list_select_related = ["admin__user"]
+    search_fields = ["^name"]
+    autocomplete_fields = ["admin"]
+    date_hierarchy = "created"
+
+
+@admin.register(models.Enrollment)
+class EnrollmentAdmin(LargeTableAdmin, admin.ModelAdmin):
+    list_display = ["course", "student", "accepted"]
+    list_select_related = ["course", "student__user"]
+    list_filter = ["accepted"]
+    search_fields = ["^course__title", "=student__user__username"]
+    autocomplete_fields = ["course", "student"]
+
+
+@admin.register(models.Handout)
+class HandoutAdmin(BackgroundDeleteAdmin, LargeTableAdmin, admin.ModelAdmin):
+    list_display = ["name", "course", "section"]
+    list_select_related = ["course", "section"]
+    list_filter = ["section"]
+    search_fields = ["^name", "^course__title"]
+    autocomplete_fields = ["course"]
+
+
+class TranslatedAdmin(admin.ModelAdmin):
+    # The change form edits every language
+    def get_queryset(self, request):
+        return super().get_queryset(request).all_languages()
+
+
+@admin.register(models.City)
+class CityAdmin(LargeTableAdmin, TranslatedAdmin):
+    list_display = ["name", "codepostal"]
+    search_fields = ["^name", "=codepostal"]
+
+
+translated_objects = (
     models.CourseArea,
-    models.City,
     models.CourseLevel,
     models.CourseAge,
     models.CourseLanguage,
     models.CourseLocationType,
+)
+
+model_objects = (
     models.Currency,
     models.CourseDuration,
-    models.Enrollment,
     models.HandoutSection,
-    models.Handout,
 )
 
 for m in model_objects:
     admin.site.register(m, type(m.__name__ + "Admin", (admin.ModelAdmin,), {}))
+
+for m in translated_objects:
+    admin.site.register(m, type(m.__name__ + "Admin", (TranslatedAdmin,), {}))
@@ -5,3 +5,6 @@ from django.utils.translation import ugettext_lazy as _
 class CoursesConfig(AppConfig):
     name = "opencourse.courses"
     verbose_name = _("Courses")
+
+    def ready(self):
+        from . import signals  # noqa
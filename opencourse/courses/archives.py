@@ -0,0 +1,74 @@
+import os
+import time
+import zipfile
+from collections import Counter
+
+from django.conf import settings
+
+
+class ZipSink:
+    """Write-only, non-seekable file object for ``zipfile``.
+
+    ``zipfile`` writes local headers and data descriptors sequentially to it,
+    and the bytes written since the last ``pop`` are handed to the response.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of ``(arcname, storage, name)`` entries chunk by chunk.
+
+    Files are read and written one block at a time, so memory use does not
+    depend on the size of the archive. Entries are stored uncompressed since
+    handouts are mostly already compressed documents.
+    """
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, storage, name in entries:
+            try:
+                source = storage.open(name, "rb")
+            except FileNotFoundError:
+                continue
+            with source:
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                large = source.size >= zipfile.ZIP64_LIMIT
+                with archive.open(info, mode="w", force_zip64=large) as target:
+                    for block in iter(
+                        lambda: source.read(settings.HANDOUT_UPLOAD_BLOCK_SIZE), b""
+                    ):
+                        target.write(block)
+                        yield sink.pop()
+            yield sink.pop()
+    yield sink.pop()
+
+
+def handout_entries(handouts):
+    seen = Counter()
+    for handout in handouts:
+        extension = os.path.splitext(handout.attachment.name)[1]
+        arcname = "{}/{}".format(
+            str(handout.section).replace("/", "-"), str(handout).replace("/", "-")
+        )
+        seen[arcname] += 1
+        if seen[arcname] > 1:
+            arcname = f"{arcname} ({seen[arcname]})"
+        yield arcname + extension, handout.attachment.storage, handout.attachment.name
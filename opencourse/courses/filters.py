@@ -1,8 +1,34 @@
 from django.utils.translation import ugettext_lazy as _
 import django_filters
+from django_filters import fields
+from opencourse.core.forms import CachedChoicesMixin
 from . import models
 
 
+class CachedModelChoiceField(CachedChoicesMixin, fields.ModelChoiceField):
+    pass
+
+
+class CachedModelMultipleChoiceField(
+    CachedChoicesMixin, fields.ModelMultipleChoiceField
+):
+    pass
+
+
+class CachedModelChoiceFilter(django_filters.ModelChoiceFilter):
+    field_class = CachedModelChoiceField
+
+
+class CachedModelMultipleChoiceFilter(django_filters.ModelMultipleChoiceFilter):
+    field_class = CachedModelMultipleChoiceField
+
+
+CACHED_FILTERS = {
+    django_filters.ModelChoiceFilter: CachedModelChoiceFilter,
+    django_filters.ModelMultipleChoiceFilter: CachedModelMultipleChoiceFilter,
+}
+
+
 class CourseFilter(django_filters.FilterSet):
     class Meta:
         model = models.Course
@@ -31,6 +57,12 @@ class CourseFilter(django_filters.FilterSet):
         for filt in self.filters.values():
             filt.label = labels[filt.field_name]
 
+    @classmethod
+    def filter_for_lookup(cls, field, lookup_type):
+        # The facets are rendered on every search, from the tiered cache
+        filter_class, params = super().filter_for_lookup(field, lookup_type)
+        return CACHED_FILTERS.get(filter_class, filter_class), params
+
 
 class CenterFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr="icontains")
@@ -1,8 +1,13 @@
+import os
+
 from django import forms
+from django.conf import settings
 from django.forms.models import inlineformset_factory
+from django.template.defaultfilters import filesizeformat
 from django.utils.translation import ugettext_lazy as _
 from crispy_forms.helper import FormHelper
-from . import models
+from opencourse.core.forms import CachedModelChoiceField, PictureField
+from . import models, transfer
 from django.db.models import Q
 
 
@@ -55,10 +60,10 @@ class CourseSearchForm(forms.Form):
         self.helper.form_show_labels = False
         self.helper.field_class = "form-field"
 
-    city = forms.ModelChoiceField(
+    city = CachedModelChoiceField(
         models.City.objects.order_by("name"), empty_label=_("City"), required=False
     )
-    area = forms.ModelChoiceField(
+    area = CachedModelChoiceField(
         models.CourseArea.objects.order_by("name"), empty_label=_("Area"), required=True
     )
     name = forms.CharField(
@@ -113,10 +118,40 @@ class HandoutForm(forms.ModelForm):
         }
 
 
+class HandoutUploadForm(forms.ModelForm):
+    class Meta:
+        model = models.HandoutUpload
+        fields = ["filename", "size", "checksum"]
+
+    def clean_size(self):
+        size = self.cleaned_data["size"]
+        if not 0 < size <= settings.HANDOUT_UPLOAD_MAX_SIZE:
+            raise forms.ValidationError(_("File size is out of the allowed range."))
+        return size
+
+    def clean_checksum(self):
+        checksum = self.cleaned_data["checksum"].lower()
+        if len(checksum) != 64 or set(checksum) - set("0123456789abcdef"):
+            raise forms.ValidationError(_("Invalid SHA-256 checksum."))
+        return checksum
+
+
+class HandoutUploadCompleteForm(forms.ModelForm):
+    class Meta:
+        model = models.Handout
+        fields = [
+            "name",
+            "description",
+            "section",
+        ]
+
+
 class EnrollmentCreateForm(forms.ModelForm):
     class Meta:
         model = models.Enrollment
         fields = ["id", "course", "student"]
+        # Rendered with the course, selects would load every course and student
+        widgets = {"course": forms.HiddenInput, "student": forms.HiddenInput}
 
 
 class CenterForm(forms.ModelForm):
@@ -132,9 +167,28 @@ class CenterForm(forms.ModelForm):
             "description": _("Description"),
             "picture": _("Picture"),
         }
+        field_classes = {"picture": PictureField}
 
 
 class JoinRequestCreateForm(forms.ModelForm):
     class Meta:
         model = models.JoinRequest
         fields = ["id", "center", "professor"]
+
+
+class CourseImportForm(forms.Form):
+    file = forms.FileField(
+        label=_("File"), help_text=_("A .csv or .jsonl file, as exported.")
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        self.cleaned_data["format"] = os.path.splitext(file.name)[1][1:].lower()
+        if self.cleaned_data["format"] not in transfer.FORMATS:
+            raise forms.ValidationError(_("Unsupported file type."))
+        if file.size > settings.COURSE_IMPORT_MAX_SIZE:
+            raise forms.ValidationError(
+                _("The file must not be larger than %(size)s.")
+                % {"size": filesizeformat(settings.COURSE_IMPORT_MAX_SIZE)}
+            )
+        return file
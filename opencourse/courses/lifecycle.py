@@ -0,0 +1,102 @@
+"""Flags of courses and professors that follow their dates.
+
+Searches filter on the stored flags rather than comparing dates in every
+query, and ``updatelifecycle`` flips the flags as the windows open and close:
+
+- ``Course.active`` is cleared when ``dateexp`` passes;
+- ``Course.hostactive`` is set when ``starthostdate`` passes on a hosted
+  course, and cleared when ``endhostdate`` passes;
+- ``Professor.listed`` is cleared when ``dateexpir`` passes.
+
+Only the rows whose date passed since the previous run are flipped, so flags
+changed by hand, or on rows without dates, are left as they are. A date set
+in the past, from the admin or an import, is not gone over unless the command
+is run with ``--since``.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Q
+
+from opencourse.profiles.models import Professor
+from . import models
+
+
+def open_until(field, now):
+    return Q(**{f"{field}__isnull": True}) | Q(**{f"{field}__gt": now})
+
+
+def passed(field, since, now):
+    return Q(**{f"{field}__gt": since, f"{field}__lte": now})
+
+
+def rules(since, now):
+    """(model, flag, value, rows whose edge passed) between ``since`` and
+    ``now``.
+    """
+    return [
+        (models.Course, "active", False, passed("dateexp", since, now)),
+        (
+            models.Course,
+            "hostactive",
+            True,
+            Q(hosted=True)
+            & passed("starthostdate", since, now)
+            & open_until("endhostdate", now),
+        ),
+        (models.Course, "hostactive", False, passed("endhostdate", since, now)),
+        (Professor, "listed", False, passed("dateexpir", since, now)),
+    ]
+
+
+def update_flag(queryset, field, value, batch_size=1000, pause=0):
+    """Set ``field`` to ``value`` on the rows of ``queryset``, in batches of
+    ``batch_size`` rows committed separately, ``pause`` seconds apart.
+
+    Rows locked by another transaction are skipped, so this neither waits for
+    nor blocks a user saving a course. Returns the updated and skipped counts.
+    """
+    stale = queryset.exclude(**{field: value}).order_by("pk")
+    updated = 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                stale.select_for_update(skip_locked=True).values_list("pk", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not pks:
+                return updated, stale.count()
+            updated += queryset.model._default_manager.filter(pk__in=pks).update(
+                **{field: value}
+            )
+        if pause:
+            time.sleep(pause)
+
+
+def update_flags(since, now, batch_size=1000, pause=0):
+    """Flip the flags whose edge passed between ``since`` and ``now``,
+    yielding (model, flag, value, updated, skipped) counts.
+    """
+    for model, field, value, condition in rules(since, now):
+        queryset = model._default_manager.filter(condition)
+        updated, skipped = update_flag(queryset, field, value, batch_size, pause)
+        yield model, field, value, updated, skipped
+
+
+def run(now, batch_size=1000, pause=0, since=None):
+    """Update the flags from the previous complete run, or ``since``, to
+    ``now``, yielding the counts of update_flags().
+
+    A run that skipped locked rows is not recorded, the next one goes over the
+    same dates again.
+    """
+    last_run, _ = models.LifecycleRun.objects.get_or_create(
+        pk=1, defaults={"ran_at": now}
+    )
+    complete = True
+    for change in update_flags(since or last_run.ran_at, now, batch_size, pause):
+        complete = complete and not change[-1]
+        yield change
+    if complete:
+        models.LifecycleRun.objects.filter(pk=1, ran_at__lt=now).update(ran_at=now)
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from opencourse.courses.models import HandoutUpload
+
+
+class Command(BaseCommand):
+    help = "Remove chunked handout uploads that were abandoned before completion."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=24,
+            help="Age after which an unfinished upload is discarded.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        uploads = HandoutUpload.objects.filter(created__lt=cutoff)
+        count = 0
+        for upload in uploads.iterator():
+            upload.discard()
+            count += 1
+        self.stdout.write(f"Removed {count} abandoned upload(s).")
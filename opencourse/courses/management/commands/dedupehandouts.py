@@ -0,0 +1,26 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from opencourse.courses.models import Handout
+
+
+class Command(BaseCommand):
+    help = "Move handouts stored before content addressing into the shared blob store."
+
+    def handle(self, *args, **options):
+        storage = Handout._meta.get_field("attachment").storage
+        handouts = Handout.objects.exclude(
+            attachment__startswith=storage.prefix + "/"
+        ).exclude(attachment="")
+        moved = 0
+        for handout in handouts.iterator():
+            legacy = handout.attachment.name
+            if not storage.exists(legacy):
+                self.stderr.write(f"Missing file for handout {handout.pk}: {legacy}")
+                continue
+            with storage.open(legacy) as f:
+                name = storage.save(legacy, File(f))
+            Handout.objects.filter(pk=handout.pk).update(attachment=name)
+            storage.delete(legacy)
+            moved += 1
+        self.stdout.write(f"Moved {moved} handout(s) to the blob store.")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from opencourse.courses import models, transfer
+
+
+class Command(BaseCommand):
+    help = "Export courses as CSV or JSON lines, streamed in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=transfer.FORMATS, default="csv")
+        parser.add_argument("--professor", help="Username of the professor.")
+        parser.add_argument("--center", type=int, help="Primary key of the center.")
+        parser.add_argument("--language", help="Language of the facet names.")
+        parser.add_argument("--output", help="File to write, stdout by default.")
+
+    def handle(self, *args, **options):
+        courses = models.Course.objects.all()
+        if options["professor"]:
+            courses = courses.filter(professor__user__username=options["professor"])
+        if options["center"]:
+            courses = courses.filter(center=options["center"])
+        chunks = transfer.export_courses(
+            courses, transfer.FORMATS[options["format"]], options["language"]
+        )
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        try:
+            with open(options["output"], "w", encoding="utf-8", newline="") as f:
+                f.writelines(chunks)
+        except OSError as e:
+            raise CommandError(e)
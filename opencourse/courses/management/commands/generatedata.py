@@ -0,0 +1,402 @@
+"""Generate a large synthetic catalog for performance testing.
+
+Professors, students, centers, courses with their facets and locations,
+enrollments, reviews and the guardian permissions of the course owners are
+inserted in batches: with COPY on PostgreSQL, with bulk_create elsewhere.
+Primary keys are assigned here, so no row has to be read back.
+
+Popularity is skewed like on a real catalog: the professor of a course, its
+city and areas, the courses students enroll to and the professors they
+review are drawn from Zipf-like distributions, where the k-th most popular
+item weighs 1 / k ** --skew. The same --seed gives the same dataset on an
+empty database, e.g.:
+
+    ./manage.py generatedata --courses 1000000 --seed 1
+"""
+import csv
+import io
+import itertools
+import random
+import time
+
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from guardian.models import UserObjectPermission
+
+from opencourse.courses import models
+from opencourse.profiles.models import Professor, Review, Student, User
+
+FIRST_NAMES = (
+    "Alice Bruno Chloé David Emma Farid Gabriel Hugo Inès Jade Karim Léa".split()
+)
+LAST_NAMES = (
+    "Martin Bernard Dubois Thomas Robert Richard Petit Durand Leroy Moreau".split()
+)
+ENROLLMENT_STATUSES = ((True, 0.7), (None, 0.2), (False, 0.1))
+SCORES = ((5, 6), (4, 4), (3, 2), (2, 1), (1, 1))
+
+
+class Zipf:
+    """Draw items of ``population`` with Zipf-like popularity.
+
+    Ranks are shuffled, so that the most popular items aren't the first ones.
+    """
+
+    def __init__(self, rng, population, skew):
+        self.rng = rng
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(
+            itertools.accumulate(
+                1 / k ** skew for k in range(1, len(self.population) + 1)
+            )
+        )
+
+    def sample(self, k=1):
+        return self.rng.choices(self.population, cum_weights=self.cum_weights, k=k)
+
+    def distinct(self, k):
+        """``k`` distinct items, at most the population size."""
+        k = min(k, len(self.population))
+        items = set()
+        while len(items) < k:
+            items.update(self.sample(k - len(items)))
+        return items
+
+
+class Writer:
+    """Insert model instances in batches, keeping counts per model."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.counts = {}
+        self.durations = {}
+        self.copy = connection.vendor == "postgresql"
+
+    def insert(self, model, objects):
+        start = time.perf_counter()
+        objects = iter(objects)
+        count = 0
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                break
+            if self.copy:
+                self.copy_batch(model, batch)
+            else:
+                model.objects.bulk_create(batch)
+            count += len(batch)
+        self.counts[model] = self.counts.get(model, 0) + count
+        self.durations[model] = (
+            self.durations.get(model, 0) + time.perf_counter() - start
+        )
+
+    def copy_batch(self, model, batch):
+        fields = [
+            field
+            for field in model._meta.local_concrete_fields
+            # Left to the database when not assigned here
+            if not (field.primary_key and getattr(batch[0], field.attname) is None)
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in batch:
+            row = []
+            for field in fields:
+                value = field.get_db_prep_save(getattr(obj, field.attname), connection)
+                row.append(r"\N" if value is None else value)
+            writer.writerow(row)
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(field.column) for field in fields),
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(no_style(), list(self.counts))
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def next_id(model):
+    return (model.objects.aggregate(Max("pk"))["pk__max"] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = "Generate a large synthetic catalog with skewed distributions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=10000)
+        parser.add_argument(
+            "--professors", type=int, help="Default: one per 10 courses."
+        )
+        parser.add_argument("--students", type=int, help="Default: two per course.")
+        parser.add_argument(
+            "--centers", type=int, help="Default: one per 10 professors."
+        )
+        parser.add_argument(
+            "--enrollments",
+            type=float,
+            default=4,
+            help="Average number of enrollments per student.",
+        )
+        parser.add_argument(
+            "--reviews",
+            type=float,
+            default=3,
+            help="Average number of reviews per professor.",
+        )
+        parser.add_argument("--skew", type=float, default=0.8)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.skew = options["skew"]
+        self.now = timezone.now()
+        courses = options["courses"]
+        professors = options["professors"] or max(courses // 10, 1)
+        students = options["students"] or courses * 2
+        centers = options["centers"] or max(professors // 10, 1)
+
+        self.writer = Writer(options["batch_size"])
+        start = time.perf_counter()
+        self.reference_data()
+        professor_users = self.create_profiles(
+            Professor, "professor", professors, "access_professor_pages"
+        )
+        student_ids = self.create_profiles(
+            Student, "student", students, "access_student_pages"
+        )
+        center_admins = self.create_centers(list(professor_users), centers)
+        course_ids = self.create_courses(professor_users, center_admins, courses)
+        self.create_enrollments(course_ids, student_ids, options["enrollments"])
+        self.create_reviews(professor_users, student_ids, options["reviews"])
+        if self.writer.copy:
+            self.writer.reset_sequences()
+
+        if options["verbosity"] < 1:
+            return
+        for model, count in self.writer.counts.items():
+            duration = self.writer.durations[model]
+            self.stdout.write(
+                f"{model._meta.label:<40}{count:>12,} rows {duration:>8.1f}s"
+            )
+        self.stdout.write(f"Done in {time.perf_counter() - start:.1f}s")
+
+    def reference_data(self):
+        """The facets courses are filtered on, created when missing."""
+        self.facets = {}
+        for model, count, fields in (
+            (models.CourseArea, 40, {"name": "Area {}"}),
+            (models.City, 300, {"name": "City {}", "codepostal": "{:05}"}),
+            (models.CourseLevel, 4, {"name": "Level {}"}),
+            (models.CourseAge, 5, {"name": "Age {}", "max": "{}"}),
+            (models.CourseLanguage, 5, {"name": "Language {}", "tag": "{}"}),
+            (models.CourseDuration, 6, {"duration": "{}"}),
+            (models.CourseLocationType, 3, {"name": "Location {}"}),
+            (models.HandoutSection, 4, {"name": "Section {}"}),
+            (models.Currency, 1, {"name": "Euro", "iso_code": "EUR", "symbol": "€"}),
+        ):
+            if not model.objects.exists():
+                self.writer.insert(
+                    model,
+                    (
+                        model(**{key: value.format(i) for key, value in fields.items()})
+                        for i in range(1, count + 1)
+                    ),
+                )
+            self.facets[model] = list(model.objects.values_list("pk", flat=True))
+
+    def create_profiles(self, profile_class, prefix, count, permission):
+        """Create users with their profile, returning {profile id: user id}."""
+        user_id = next_id(User)
+        profile_id = next_id(profile_class)
+        ids = {profile_id + i: user_id + i for i in range(count)}
+        self.writer.insert(
+            User,
+            (
+                User(
+                    pk=pk,
+                    username=f"{prefix}{pk}",
+                    email=f"{prefix}{pk}@example.com",
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password="!",
+                    date_joined=self.now,
+                )
+                for pk in ids.values()
+            ),
+        )
+        permission = Permission.objects.get(codename=permission)
+        through = User.user_permissions.through
+        self.writer.insert(
+            through,
+            (through(user_id=pk, permission=permission) for pk in ids.values()),
+        )
+        self.writer.insert(
+            profile_class,
+            (
+                profile_class(pk=pk, user_id=user, tel=f"06{pk:08}"[:20])
+                for pk, user in ids.items()
+            ),
+        )
+        return ids
+
+    def create_centers(self, professor_ids, count):
+        """Create centers, returning {admin professor id: center id}."""
+        center_id = next_id(models.Center)
+        admins = self.rng.sample(professor_ids, min(count, len(professor_ids)))
+        self.writer.insert(
+            models.Center,
+            (
+                models.Center(
+                    pk=center_id + i,
+                    admin_id=admin,
+                    name=f"Center {center_id + i}",
+                    created=self.now,
+                )
+                for i, admin in enumerate(admins)
+            ),
+        )
+        return {admin: center_id + i for i, admin in enumerate(admins)}
+
+    def create_courses(self, professor_users, center_admins, count):
+        rng = self.rng
+        course_id = next_id(models.Course)
+        location_id = next_id(models.CourseLocation)
+        professors = Zipf(rng, professor_users, self.skew)
+        cities = Zipf(rng, self.facets[models.City], self.skew)
+        areas = Zipf(rng, self.facets[models.CourseArea], self.skew)
+        permission = Permission.objects.get(codename="manage_course")
+        content_type = ContentType.objects.get_for_model(models.Course)
+
+        batch_size = self.writer.batch_size
+        for start in range(0, count, batch_size):
+            ids = range(course_id + start, course_id + min(start + batch_size, count))
+            owners = dict(zip(ids, professors.sample(len(ids))))
+            self.writer.insert(
+                models.Course,
+                (
+                    models.Course(
+                        pk=pk,
+                        professor_id=professor,
+                        city_id=city,
+                        center_id=center_admins.get(professor),
+                        title=f"Course {pk}",
+                        descrip="Lorem ipsum dolor sit amet. " * rng.randint(1, 20),
+                        level_id=rng.choice(self.facets[models.CourseLevel]),
+                        duration_id=rng.choice(self.facets[models.CourseDuration]),
+                        active=True,
+                    )
+                    for (pk, professor), city in zip(
+                        owners.items(), cities.sample(len(ids))
+                    )
+                ),
+            )
+            for field, related, choose in (
+                ("area", "coursearea_id", lambda: areas.distinct(rng.randint(1, 3))),
+                ("age", "courseage_id", self.facet_choice(models.CourseAge, 2)),
+                (
+                    "language",
+                    "courselanguage_id",
+                    self.facet_choice(models.CourseLanguage, 2),
+                ),
+            ):
+                through = getattr(models.Course, field).through
+                self.writer.insert(
+                    through,
+                    (
+                        through(course_id=pk, **{related: value})
+                        for pk in ids
+                        for value in choose()
+                    ),
+                )
+            locations = [
+                (pk, location_type)
+                for pk in ids
+                for location_type in rng.sample(
+                    self.facets[models.CourseLocationType], rng.randint(1, 2)
+                )
+            ]
+            self.writer.insert(
+                models.CourseLocation,
+                (
+                    models.CourseLocation(
+                        pk=location_id + i,
+                        course_id=pk,
+                        location_type_id=location_type,
+                        currency_id=self.facets[models.Currency][0],
+                        price=rng.randint(10, 200),
+                        number_sessions=rng.randint(1, 30),
+                    )
+                    for i, (pk, location_type) in enumerate(locations)
+                ),
+            )
+            location_id += len(locations)
+            self.writer.insert(
+                UserObjectPermission,
+                (
+                    UserObjectPermission(
+                        user_id=professor_users[professor],
+                        permission=permission,
+                        content_type=content_type,
+                        object_pk=str(pk),
+                    )
+                    for pk, professor in owners.items()
+                ),
+            )
+        return range(course_id, course_id + count)
+
+    def facet_choice(self, model, most):
+        facets = self.facets[model]
+        return lambda: self.rng.sample(
+            facets, self.rng.randint(1, min(most, len(facets)))
+        )
+
+    def create_enrollments(self, course_ids, student_ids, average):
+        rng = self.rng
+        courses = Zipf(rng, course_ids, self.skew)
+        statuses, weights = zip(*ENROLLMENT_STATUSES)
+
+        def enrollments():
+            for student in student_ids:
+                count = 1 + int(rng.expovariate(1 / max(average - 1, 0.01)))
+                for course in courses.distinct(count):
+                    yield models.Enrollment(
+                        course_id=course,
+                        student_id=student,
+                        accepted=rng.choices(statuses, weights)[0],
+                    )
+
+        self.writer.insert(models.Enrollment, enrollments())
+
+    def create_reviews(self, professor_users, student_ids, average):
+        rng = self.rng
+        professors = Zipf(rng, professor_users, self.skew)
+        students = list(student_ids)
+        scores, weights = zip(*SCORES)
+        content_type = ContentType.objects.get_for_model(Student)
+        count = int(len(professor_users) * average)
+        self.writer.insert(
+            Review,
+            (
+                Review(
+                    professor_id=professor,
+                    author_id=rng.choice(students),
+                    content_type=content_type,
+                    score=rng.choices(scores, weights)[0],
+                    text="Lorem ipsum dolor sit amet.",
+                )
+                for professor in professors.sample(count)
+            ),
+        )
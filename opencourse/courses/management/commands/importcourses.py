@@ -0,0 +1,44 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from opencourse.courses import transfer
+from opencourse.profiles.models import Professor
+
+
+class Command(BaseCommand):
+    help = "Import the courses of a professor from CSV or JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--professor", required=True, help="Username.")
+        parser.add_argument(
+            "--format",
+            choices=transfer.FORMATS,
+            help="Guessed from the file extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            professor = Professor.objects.select_related("user").get(
+                user__username=options["professor"]
+            )
+        except Professor.DoesNotExist:
+            raise CommandError(f"No professor {options['professor']}.")
+        name = options["format"] or os.path.splitext(options["path"])[1][1:].lower()
+        if name not in transfer.FORMATS:
+            raise CommandError("Unknown format, use --format.")
+
+        importer = transfer.CourseImporter(professor, options["batch_size"])
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as f:
+                importer.run(transfer.FORMATS[name], f)
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(e)
+        for line, messages in importer.errors:
+            self.stderr.write(f"Line {line}: {' '.join(messages)}")
+        self.stdout.write(
+            f"Imported {importer.created} course(s), "
+            f"skipped {len(importer.errors)} invalid one(s)."
+        )
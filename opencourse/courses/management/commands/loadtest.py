@@ -0,0 +1,374 @@
+"""Drive the main user journeys with concurrent clients and report latencies.
+
+A test database is created and seeded, then ``--clients`` threads each run
+journeys in a loop for ``--duration`` seconds through the Django test client,
+so the whole middleware and template stack is exercised without a server:
+
+- anonymous: course search, search results, course detail;
+- student: course detail, enrollment, handout list;
+- professor: course edit, then saving the course with its location formset.
+
+Latency percentiles, requests per second and queries per request are
+reported per URL name and saved as JSON, e.g.:
+
+    ./manage.py loadtest --clients 8 --duration 30
+    git checkout my-branch
+    ./manage.py loadtest --clients 8 --duration 30 --compare loadtest/<sha>.json
+
+Numbers are only comparable between runs on the same machine and database
+backend. On sqlite the test database is a file, as concurrent writes to a
+shared in-memory database fail instead of waiting.
+"""
+import json
+import math
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+
+from opencourse.core.instrumentation import QueryCounter
+from opencourse.courses import forms, models
+from opencourse.profiles.models import Professor, Student
+
+JOURNEYS = {"anonymous": 6, "student": 3, "professor": 1}
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of the sorted ``values``."""
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def form_data(*forms):
+    """POST data submitting the forms unchanged."""
+    data = {}
+    for form in forms:
+        for bound in form:
+            value = bound.value()
+            if value is not None:
+                data[bound.html_name] = value
+    return data
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Dataset:
+    """The ids the journeys pick from."""
+
+    def __init__(self, courses, areas, cities, students, professors):
+        self.courses = courses
+        self.areas = areas
+        self.cities = cities
+        # [(user, student, {accepted course pk: has handouts})]
+        self.students = students
+        # [(user, [course pk])]
+        self.professors = professors
+
+
+class LoadClient(threading.Thread):
+    def __init__(self, index, dataset, deadline, seed):
+        super().__init__(daemon=True)
+        self.index = index
+        self.dataset = dataset
+        self.deadline = deadline
+        self.random = random.Random(seed + index)
+        self.client = Client(raise_request_exception=False)
+        self.samples = []
+        self.user = None
+        self.edit_data = {}
+
+    def run(self):
+        names, weights = zip(*JOURNEYS.items())
+        try:
+            while time.monotonic() < self.deadline:
+                journey = self.random.choices(names, weights)[0]
+                getattr(self, journey)()
+        finally:
+            connections.close_all()
+
+    def request(self, name, method, url, data=None, expected=None):
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            response = getattr(self.client, method)(url, data)
+        elapsed = time.perf_counter() - start
+        status = response.status_code
+        failed = status != expected if expected else status >= 400
+        self.samples.append(
+            (f"{method.upper()} {name}", elapsed, counter.count, failed)
+        )
+        return response
+
+    def login(self, user):
+        if user is None:
+            self.client.logout()
+        elif user != self.user:
+            self.client.force_login(user)
+        self.user = user
+
+    def anonymous(self):
+        self.login(None)
+        self.request("courses:search", "get", reverse("courses:search"))
+        self.request(
+            "courses:search_results",
+            "get",
+            reverse("courses:search_results"),
+            {
+                "area": self.random.choice(self.dataset.areas),
+                "city": self.random.choice(self.dataset.cities),
+            },
+        )
+        pk = self.random.choice(self.dataset.courses)
+        self.request("courses:detail", "get", reverse("courses:detail", args=[pk]))
+
+    def student(self):
+        # Clients don't share users, so enrollments can't collide
+        students = self.dataset.students
+        user, student, enrolled = students[self.index % len(students)]
+        self.login(user)
+
+        pk = self.random.choice(self.dataset.courses)
+        self.request("courses:detail", "get", reverse("courses:detail", args=[pk]))
+        if pk not in enrolled:
+            enrolled[pk] = False
+            self.request(
+                "courses:enrollments:create",
+                "post",
+                reverse("courses:enrollments:create"),
+                {"course": pk, "student": student},
+            )
+        accepted = [pk for pk, handouts in enrolled.items() if handouts]
+        if accepted:
+            url = reverse("courses:handouts:list", args=[self.random.choice(accepted)])
+            self.request("courses:handouts:list", "get", url)
+
+    def professor(self):
+        professors = self.dataset.professors
+        user, courses = professors[self.index % len(professors)]
+        self.login(user)
+
+        pk = self.random.choice(courses)
+        url = reverse("courses:edit", args=[pk])
+        self.request("courses:edit", "get", url)
+        if pk not in self.edit_data:
+            course = models.Course.objects.get(pk=pk)
+            formset = forms.CourseLocationFormset(instance=course)
+            self.edit_data[pk] = form_data(
+                forms.CourseForm(instance=course, professor=user.professor),
+                formset.management_form,
+                *formset.initial_forms,
+            )
+        # The form is redisplayed with a 200 when it doesn't validate
+        self.request("courses:edit", "post", url, self.edit_data[pk], expected=302)
+
+
+class Command(BaseCommand):
+    help = "Load test the main user journeys against a seeded test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=20, help="Seconds.")
+        parser.add_argument("--courses", type=int, default=1000)
+        parser.add_argument("--professors", type=int, default=50)
+        parser.add_argument("--students", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output", help="JSON results file, loadtest/<commit>.json by default."
+        )
+        parser.add_argument("--compare", help="JSON results of an earlier run.")
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the seeded test database for the next run.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        verbosity = options["verbosity"]
+        self.use_file_databases()
+        allowed_hosts = settings.ALLOWED_HOSTS
+        settings.ALLOWED_HOSTS = [*allowed_hosts, "testserver"]
+        old_config = setup_databases(verbosity, False, keepdb=options["keepdb"])
+        try:
+            if not models.Course.objects.exists():
+                self.stdout.write("Seeding the test database...")
+                self.seed(options)
+            dataset = self.dataset()
+            results = self.run(dataset, options)
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity, keepdb=options["keepdb"])
+            settings.ALLOWED_HOSTS = allowed_hosts
+
+        self.report(results, baseline)
+        output = options["output"] or os.path.join(
+            "loadtest", f"{results['commit'] or 'results'}.json"
+        )
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(f"Results saved to {output}")
+
+    def use_file_databases(self):
+        for connection in connections.all():
+            test = connection.settings_dict["TEST"]
+            if connection.vendor == "sqlite" and not test.get("MIRROR"):
+                test["NAME"] = test.get("NAME") or os.path.join(
+                    tempfile.gettempdir(), f"loadtest_{connection.alias}.sqlite3"
+                )
+
+    def seed(self, options):
+        call_command(
+            "generatedata",
+            courses=options["courses"],
+            professors=options["professors"],
+            students=options["students"],
+            seed=options["seed"],
+            verbosity=0,
+        )
+        rng = random.Random(options["seed"])
+        sections = list(models.HandoutSection.objects.all())
+        models.Handout.objects.bulk_create(
+            models.Handout(
+                course_id=pk,
+                name=f"Handout {i}",
+                attachment=f"handouts/loadtest/{i}.pdf",
+                section=rng.choice(sections),
+            )
+            for pk in models.Course.objects.values_list("pk", flat=True)
+            for i in range(rng.randint(0, 4))
+        )
+
+    def dataset(self):
+        with_handouts = set(
+            models.Handout.objects.values_list("course", flat=True).distinct()
+        )
+        enrolled = defaultdict(dict)
+        for student, course in models.Enrollment.objects.filter(
+            accepted=True
+        ).values_list("student", "course"):
+            enrolled[student][course] = course in with_handouts
+        courses = defaultdict(list)
+        for professor, course in models.Course.objects.values_list("professor", "pk"):
+            courses[professor].append(course)
+        return Dataset(
+            courses=list(models.Course.objects.values_list("pk", flat=True)),
+            areas=list(models.CourseArea.objects.values_list("pk", flat=True)),
+            cities=list(models.City.objects.values_list("pk", flat=True)),
+            students=[
+                (student.user, student.pk, enrolled[student.pk])
+                for student in Student.objects.select_related("user")
+            ],
+            professors=[
+                (professor.user, courses[professor.pk])
+                for professor in Professor.objects.select_related("user")
+                if courses[professor.pk]
+            ],
+        )
+
+    def run(self, dataset, options):
+        self.stdout.write(
+            f"Running {options['clients']} clients for {options['duration']:g}s..."
+        )
+        start = time.monotonic()
+        clients = [
+            LoadClient(i, dataset, start + options["duration"], options["seed"])
+            for i in range(options["clients"])
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - start
+
+        samples = defaultdict(list)
+        for client in clients:
+            for name, duration, queries, failed in client.samples:
+                samples[name].append((duration, queries, failed))
+
+        urls = {}
+        for name, values in sorted(samples.items()):
+            durations = sorted(duration for duration, _, _ in values)
+            urls[name] = {
+                "requests": len(values),
+                "errors": sum(failed for _, _, failed in values),
+                "rps": len(values) / elapsed,
+                "queries": sum(queries for _, queries, _ in values) / len(values),
+                "mean": sum(durations) / len(durations) * 1000,
+                **{f"p{p}": percentile(durations, p) * 1000 for p in PERCENTILES},
+            }
+        total = sum(url["requests"] for url in urls.values())
+        return {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "database": connections["default"].vendor,
+            "options": {
+                key: options[key]
+                for key in ("clients", "duration", "courses", "professors", "students")
+            },
+            "elapsed": elapsed,
+            "requests": total,
+            "rps": total / elapsed,
+            "urls": urls,
+        }
+
+    def report(self, results, baseline=None):
+        header = f"{'url':<36}{'reqs':>7}{'err':>5}{'rps':>8}{'queries':>9}"
+        header += "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+        self.stdout.write(header)
+        for name, url in results["urls"].items():
+            line = (
+                f"{name:<36}{url['requests']:>7}{url['errors']:>5}"
+                f"{url['rps']:>8.1f}{url['queries']:>9.1f}"
+            )
+            line += "".join(f"{url[f'p{p}']:>10.1f}" for p in PERCENTILES)
+            self.stdout.write(line)
+            previous = baseline and baseline["urls"].get(name)
+            if previous:
+                self.stdout.write(
+                    f"{'  vs ' + str(baseline['commit']):<48}"
+                    f"{self.change(url['rps'], previous['rps']):>8}"
+                    f"{self.change(url['queries'], previous['queries']):>9}"
+                    + "".join(
+                        f"{self.change(url[f'p{p}'], previous[f'p{p}']):>10}"
+                        for p in PERCENTILES
+                    )
+                )
+        self.stdout.write(
+            f"{results['requests']} requests in {results['elapsed']:.1f}s, "
+            f"{results['rps']:.1f} requests/s"
+        )
+
+    def change(self, value, previous):
+        if not previous:
+            return "-"
+        return f"{(value - previous) / previous:+.0%}"
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from opencourse.courses import lifecycle
+
+
+class Command(BaseCommand):
+    help = (
+        "Flip the active, hosting and listing flags of courses and professors "
+        "whose dates were reached. Meant to run every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows updated per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds between batches, to spread the load.",
+        )
+        parser.add_argument(
+            "--since",
+            type=parse_datetime,
+            help="Go over the dates from this ISO 8601 time rather than from "
+            "the previous run. Needed after dates were set in the past, from "
+            "the admin or an import, which the regular runs do not go over.",
+        )
+
+    def handle(self, *args, **options):
+        changes = lifecycle.run(
+            timezone.now(),
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            since=options["since"],
+        )
+        for model, field, value, updated, skipped in changes:
+            self.stdout.write(
+                f"{model._meta.label}.{field}={value}: {updated} updated, "
+                f"{skipped} locked."
+            )
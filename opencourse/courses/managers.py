@@ -1,12 +1,127 @@
 from django.db import models
+from django.db.models.query import ModelIterable
+from modeltranslation.translator import NotRegistered, translator
+from modeltranslation.utils import get_language, resolution_order
 
 
-class CourseManager(models.Manager):
+def unused_translation_fields(model, prefix=""):
+    """Translation columns of ``model`` never read in the active language."""
+    try:
+        opts = translator.get_options_for_model(model)
+    except NotRegistered:
+        return []
+    languages = resolution_order(
+        get_language(), getattr(opts, "fallback_languages", None)
+    )
+    return [
+        prefix + field.name
+        for fields in opts.fields.values()
+        for field in fields
+        if field.language not in languages
+    ]
+
+
+def unused_related_translation_fields(model, related, prefix=""):
+    fields = []
+    for name, nested in related.items():
+        related_model = model._meta.get_field(name).related_model
+        path = f"{prefix}{name}__"
+        fields += unused_translation_fields(related_model, path)
+        fields += unused_related_translation_fields(related_model, nested, path)
+    return fields
+
+
+class TranslatedQuerySet(models.QuerySet):
+    """Defer the translation columns that the active language doesn't use,
+    on the model itself and on the models joined with select_related().
+
+    The columns are picked when the queryset is evaluated, so querysets built
+    at import time (form and filter choices) follow the request language.
+    """
+
+    prune_translations = True
+
+    def all_languages(self):
+        clone = self._chain()
+        clone.prune_translations = False
+        return clone
+
+    def _clone(self, *args, **kwargs):
+        clone = super()._clone(*args, **kwargs)
+        clone.prune_translations = self.prune_translations
+        return clone
+
+    def _pruned(self):
+        """A chained copy of the queryset deferring the unused translation
+        columns, or None when there are none to defer.
+        """
+        # only() and values() name their columns explicitly
+        _, defer = self.query.deferred_loading
+        if not (
+            self.prune_translations and defer and self._iterable_class is ModelIterable
+        ):
+            return None
+        fields = unused_translation_fields(self.model)
+        if isinstance(self.query.select_related, dict):
+            fields += unused_related_translation_fields(
+                self.model, self.query.select_related
+            )
+        if not fields:
+            return None
+        return self.defer(*fields)
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            pruned = self._pruned()
+            if pruned is not None:
+                self._result_cache = list(pruned._iterable_class(pruned))
+        super()._fetch_all()
+
+    def iterator(self, chunk_size=2000):
+        pruned = self._pruned()
+        if pruned is None:
+            return super().iterator(chunk_size)
+        return super(TranslatedQuerySet, pruned).iterator(chunk_size)
+
+
+class TranslatedManager(models.Manager):
+    use_for_related_fields = True
+
+    def get_queryset(self):
+        return TranslatedQuerySet(self.model, using=self._db, hints=self._hints)
+
+    def all_languages(self):
+        return self.get_queryset().all_languages()
+
+
+class CourseQuerySet(TranslatedQuerySet):
+    def with_details(self):
+        """Courses with everything components/course_body.html shows."""
+        return self.select_related(
+            "professor__user", "city", "center", "level", "duration"
+        ).prefetch_related(
+            "area",
+            "age",
+            "language",
+            "locations__location_type",
+            "locations__currency",
+        )
+
+
+class CourseManager(TranslatedManager):
     use_for_related_fields = True
 
+    def get_queryset(self):
+        return CourseQuerySet(self.model, using=self._db, hints=self._hints).filter(
+            hidden=False
+        )
+
     def created_by(self, professor):
         return self.filter(professor=professor)
 
+    def with_details(self):
+        return self.get_queryset().with_details()
+
 
 class EnrollmentManager(models.Manager):
     use_for_related_fields = True
@@ -18,6 +133,9 @@ class EnrollmentManager(models.Manager):
 class HandoutManager(models.Manager):
     use_for_related_fields = True
 
+    def get_queryset(self):
+        return super().get_queryset().filter(hidden=False)
+
     def created_by(self, professor):
         return self.filter(professor=professor)
 
@@ -25,6 +143,9 @@ class HandoutManager(models.Manager):
 class CenterManager(models.Manager):
     use_for_related_fields = True
 
+    def get_queryset(self):
+        return super().get_queryset().filter(hidden=False)
+
     def created_by(self, admin):
         return self.filter(admin=admin)
 
@@ -34,3 +155,10 @@ class JoinRequestManager(models.Manager):
 
     def created_by(self, professor):
         return self.filter(professor=professor)
+
+
+class HandoutUploadManager(models.Manager):
+    use_for_related_fields = True
+
+    def created_by(self, professor):
+        return self.filter(professor=professor)
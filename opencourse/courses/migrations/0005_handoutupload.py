@@ -0,0 +1,32 @@
+# Generated by Django 3.0.5 on 2026-10-19 17:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+        ('courses', '0004_auto_20200610_1058'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HandoutUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='courses.Course')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='profiles.Professor')),
+            ],
+            options={
+                'verbose_name': 'Handout upload',
+                'verbose_name_plural': 'Handout uploads',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.0.5 on 2026-10-19 17:38
+
+from django.db import migrations, models
+import opencourse.courses.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_handoutupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stored file',
+                'verbose_name_plural': 'Stored files',
+            },
+        ),
+        migrations.AddField(
+            model_name='handoutupload',
+            name='deduplicated',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='handout',
+            name='attachment',
+            field=models.FileField(storage=opencourse.courses.storage.ContentAddressedStorage(), upload_to='handouts/%Y-%m-%d/'),
+        ),
+    ]
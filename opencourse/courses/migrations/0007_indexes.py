@@ -0,0 +1,45 @@
+# Generated by Django 3.0.5 on 2026-10-19 18:15
+
+from django.db import migrations, models
+
+from opencourse.core.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('courses', '0006_storedblob'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['center', 'active'], name='course_center_active'),
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['dateexp'], name='course_dateexp'),
+        ),
+        AddIndexConcurrently(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'accepted'], name='enrollment_student_accepted'),
+        ),
+        AddIndexConcurrently(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'accepted'], name='enrollment_course_accepted'),
+        ),
+        AddIndexConcurrently(
+            model_name='handout',
+            index=models.Index(fields=['course', 'section'], name='handout_course_section'),
+        ),
+        AddIndexConcurrently(
+            model_name='joinrequest',
+            index=models.Index(fields=['center', 'accepted'], name='joinrequest_center_accepted'),
+        ),
+        AddIndexConcurrently(
+            model_name='joinrequest',
+            index=models.Index(fields=['professor', 'accepted'], name='joinrequest_prof_accepted'),
+        ),
+    ]
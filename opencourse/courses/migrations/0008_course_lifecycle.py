@@ -0,0 +1,48 @@
+# Generated by Django 3.0.5 on 2026-10-19 18:17
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from opencourse.core.db.operations import AddIndexConcurrently
+
+
+def set_active(apps, schema_editor):
+    # Courses created so far have no active flag, and searches now require it
+    Course = apps.get_model('courses', 'Course')
+    now = timezone.now()
+    for active, condition in (
+        (True, models.Q(dateexp__isnull=True) | models.Q(dateexp__gt=now)),
+        (False, models.Q(dateexp__lte=now)),
+    ):
+        courses = Course.objects.filter(condition, active__isnull=True)
+        while True:
+            pks = list(courses.values_list('pk', flat=True)[:10000])
+            if not pks:
+                break
+            Course.objects.filter(pk__in=pks).update(active=active)
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('courses', '0007_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='active',
+            field=models.NullBooleanField(default=True),
+        ),
+        migrations.RunPython(set_active, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(condition=models.Q(active=True), fields=['-id'], name='course_active_id'),
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(condition=models.Q(active=True), fields=['city', '-id'], name='course_active_city'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.0.5 on 2026-10-19 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_lifecycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='center',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='handout',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+    ]
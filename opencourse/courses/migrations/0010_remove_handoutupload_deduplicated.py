@@ -0,0 +1,17 @@
+# Generated by Django 3.0.5 on 2026-10-19 18:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_hidden'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='handoutupload',
+            name='deduplicated',
+        ),
+    ]
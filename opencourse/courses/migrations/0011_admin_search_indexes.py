@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from opencourse.core.db.operations import AddUpperIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('courses', '0010_remove_handoutupload_deduplicated'),
+    ]
+
+    operations = [
+        AddUpperIndexConcurrently('courses_course', 'title', 'course_title_upper'),
+        AddUpperIndexConcurrently('courses_center', 'name', 'center_name_upper'),
+        AddUpperIndexConcurrently('courses_handout', 'name', 'handout_name_upper'),
+        AddUpperIndexConcurrently('courses_city', 'name_fr', 'city_name_fr_upper'),
+        AddUpperIndexConcurrently('courses_city', 'name_ar', 'city_name_ar_upper'),
+        AddUpperIndexConcurrently('courses_city', 'name_en', 'city_name_en_upper'),
+        AddUpperIndexConcurrently('courses_city', 'codepostal', 'city_codepostal_upper'),
+    ]
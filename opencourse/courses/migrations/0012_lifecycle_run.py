@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+from opencourse.core.db.operations import AddIndexConcurrently
+
+
+def start_runs(apps, schema_editor):
+    # The flags are set from the dates passed until now by 0013
+    LifecycleRun = apps.get_model('courses', 'LifecycleRun')
+    LifecycleRun.objects.create(pk=1, ran_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('courses', '0011_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LifecycleRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ran_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Lifecycle run',
+                'verbose_name_plural': 'Lifecycle runs',
+            },
+        ),
+        migrations.RunPython(start_runs, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['starthostdate'], name='course_starthostdate'),
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['endhostdate'], name='course_endhostdate'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.models import Q
+from django.utils import timezone
+
+
+def set_flags(apps, schema_editor):
+    # Runs only go over the dates passed since the previous one, so the flags
+    # are set here from every date passed before. Same rules as
+    # courses.lifecycle, from the earliest date on.
+    Course = apps.get_model('courses', 'Course')
+    Professor = apps.get_model('profiles', 'Professor')
+    LifecycleRun = apps.get_model('courses', 'LifecycleRun')
+    now = timezone.now()
+    open_end = Q(endhostdate__isnull=True) | Q(endhostdate__gt=now)
+    for model, field, value, condition in (
+        (Course, 'active', False, Q(dateexp__lte=now)),
+        (Course, 'hostactive', True, Q(hosted=True, starthostdate__lte=now) & open_end),
+        (Course, 'hostactive', False, Q(endhostdate__lte=now)),
+        (Professor, 'listed', False, Q(dateexpir__lte=now)),
+    ):
+        stale = model.objects.filter(condition).exclude(**{field: value}).order_by('pk')
+        while True:
+            pks = list(stale.values_list('pk', flat=True)[:10000])
+            if not pks:
+                break
+            model.objects.filter(pk__in=pks).update(**{field: value})
+    LifecycleRun.objects.update_or_create(pk=1, defaults={'ran_at': now})
+
+
+class Migration(migrations.Migration):
+    # Each batch is committed on its own
+    atomic = False
+
+    dependencies = [
+        ('courses', '0012_lifecycle_run'),
+        ('profiles', '0005_professor_dateexpir_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_flags, migrations.RunPython.noop),
+    ]
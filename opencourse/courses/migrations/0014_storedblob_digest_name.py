@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def name_after_digest(apps, schema_editor):
+    # Blobs were named after their digest and extension, the same content with
+    # two extensions had two rows. The files keep their names.
+    StoredBlob = apps.get_model('courses', 'StoredBlob')
+    digests = list(StoredBlob.objects.values_list('digest', flat=True).distinct())
+    for digest in digests:
+        blob, *duplicates = StoredBlob.objects.filter(digest=digest).order_by('pk')
+        blob.name = f'handouts/sha256/{digest[:2]}/{digest[2:4]}/{digest}'
+        blob.references += sum(duplicate.references for duplicate in duplicates)
+        StoredBlob.objects.filter(pk__in=[d.pk for d in duplicates]).delete()
+        blob.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_lifecycle_backfill'),
+    ]
+
+    operations = [
+        migrations.RunPython(name_after_digest, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
-from django.http import JsonResponse
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.views.generic.edit import ModelFormMixin
-from . import forms
+
+from opencourse.core.deletion import schedule_deletion
+from . import forms, models
 
 
 class FormsetMixin(ModelFormMixin):
@@ -40,3 +44,32 @@ class JsonFormMixin:
             "errors": {k: v[0] for k, v in form.errors.items()},
         }
         return JsonResponse(data, status=400)
+
+
+class HandoutAccessMixin(LoginRequiredMixin):
+    """Load the course of ``course_pk`` once and check access to its handouts.
+
+    Students only get in when their enrollment to the course was accepted.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        self.course = get_object_or_404(models.Course, pk=self.kwargs.get("course_pk"))
+        if request.user.is_student:
+            has_access = self.course.enrollment_set.filter(
+                student=request.user.student, accepted=True
+            ).exists()
+            if not has_access:
+                return self.handle_no_permission()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class BackgroundDeleteMixin:
+    """Hide the object on delete, its deletion being left to rundeletions."""
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        schedule_deletion(self.object)
+        return HttpResponseRedirect(success_url)
@@ -1,8 +1,16 @@
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files import File
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
 from django.utils import timezone
 
 from . import managers
+from .storage import handout_storage
 from opencourse.profiles.models import Professor, Student
 
 
@@ -36,6 +44,8 @@ class City(models.Model):
     category_1 = models.SmallIntegerField(blank=True, null=True)
     category_2 = models.SmallIntegerField(blank=True, null=True)
 
+    objects = managers.TranslatedManager()
+
     class Meta:
         verbose_name = _("City")
         verbose_name_plural = _("Cities")
@@ -48,6 +58,8 @@ class CourseLevel(models.Model):
     name = models.CharField(max_length=30, blank=True, null=True)
     description = models.CharField(max_length=255, blank=True, null=True)
 
+    objects = managers.TranslatedManager()
+
     class Meta:
         verbose_name = _("Level")
         verbose_name_plural = _("Levels")
@@ -71,6 +83,8 @@ class CourseAge(models.Model):
     max = models.SmallIntegerField(blank=True, null=True)
     name = models.CharField(max_length=50, blank=True, null=True)
 
+    objects = managers.TranslatedManager()
+
     class Meta:
         verbose_name = _("Age")
         verbose_name_plural = _("Ages")
@@ -83,6 +97,8 @@ class CourseArea(models.Model):
     name = models.CharField(max_length=30, blank=True, null=True)
     description = models.CharField(max_length=255, blank=True, null=True)
 
+    objects = managers.TranslatedManager()
+
     class Meta:
         verbose_name = _("Area")
         verbose_name_plural = _("Areas")
@@ -95,6 +111,8 @@ class CourseLanguage(models.Model):
     name = models.CharField(max_length=30, blank=True, null=True)
     tag = models.CharField(max_length=2, blank=True, null=True)
 
+    objects = managers.TranslatedManager()
+
     class Meta:
         verbose_name = _("Language")
         verbose_name_plural = _("Languages")
@@ -111,6 +129,8 @@ class Center(models.Model):
         upload_to="center_pics/%Y-%m-%d/", null=True, blank=True
     )
     created = models.DateTimeField(auto_now=True, blank=True, null=True)
+    # Set on deletion, until the deletion job removes the center
+    hidden = models.BooleanField(default=False)
 
     objects = managers.CenterManager()
 
@@ -130,7 +150,8 @@ class Course(models.Model):
     descrip = models.TextField(blank=True)
     extrainfo = models.CharField(max_length=250, blank=True, null=True)
     payactive = models.NullBooleanField()
-    active = models.NullBooleanField()
+    # active and hostactive follow the dates, see courses.lifecycle
+    active = models.NullBooleanField(default=True)
     dateexp = models.DateTimeField(blank=True, null=True)
     starthostdate = models.DateTimeField(blank=True, null=True)
     endhostdate = models.DateTimeField(blank=True, null=True)
@@ -142,6 +163,8 @@ class Course(models.Model):
     area = models.ManyToManyField(CourseArea)
     language = models.ManyToManyField(CourseLanguage)
     center = models.ForeignKey(Center, on_delete=models.SET_NULL, null=True)
+    # Set on deletion, until the deletion job removes the course
+    hidden = models.BooleanField(default=False)
 
     objects = managers.CourseManager()
 
@@ -149,6 +172,21 @@ class Course(models.Model):
         verbose_name = _("Course")
         verbose_name_plural = _("Courses")
         permissions = (("manage_course", _("Manage course")),)
+        indexes = [
+            models.Index(fields=["center", "active"], name="course_center_active"),
+            models.Index(fields=["dateexp"], name="course_dateexp"),
+            models.Index(fields=["starthostdate"], name="course_starthostdate"),
+            models.Index(fields=["endhostdate"], name="course_endhostdate"),
+            # The search results, newest first, only show active courses
+            models.Index(
+                fields=["-id"], name="course_active_id", condition=Q(active=True)
+            ),
+            models.Index(
+                fields=["city", "-id"],
+                name="course_active_city",
+                condition=Q(active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title or ""
@@ -157,6 +195,8 @@ class Course(models.Model):
 class CourseLocationType(models.Model):
     name = models.CharField(max_length=25)
 
+    objects = managers.TranslatedManager()
+
     class Meta:
         verbose_name = _("Location Type")
         verbose_name_plural = _("Location Types")
@@ -212,6 +252,15 @@ class Enrollment(models.Model):
         verbose_name_plural = _("Enrollment")
         permissions = (("manage_enrollment", _("Manage enrollment")),)
         unique_together = ("course", "student")
+        indexes = [
+            # The unique index serves the lookups by course and student
+            models.Index(
+                fields=["student", "accepted"], name="enrollment_student_accepted"
+            ),
+            models.Index(
+                fields=["course", "accepted"], name="enrollment_course_accepted"
+            ),
+        ]
 
     def __str__(self):
         return "{}: {} ({})".format(self.course, self.student, self.accepted)
@@ -228,8 +277,12 @@ class Handout(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     name = models.CharField(max_length=40)
     description = models.TextField(max_length=255, blank=True, null=True)
-    attachment = models.FileField(upload_to="handouts/%Y-%m-%d/")
+    attachment = models.FileField(
+        upload_to="handouts/%Y-%m-%d/", storage=handout_storage
+    )
     section = models.ForeignKey(HandoutSection, on_delete=models.PROTECT)
+    # Set on deletion, until the deletion job removes the handout
+    hidden = models.BooleanField(default=False)
 
     objects = managers.HandoutManager()
 
@@ -237,11 +290,131 @@ class Handout(models.Model):
         verbose_name = _("Handout")
         verbose_name_plural = _("Handout")
         permissions = (("manage_handout", _("Manage handout")),)
+        indexes = [
+            models.Index(fields=["course", "section"], name="handout_course_section")
+        ]
 
     def __str__(self):
         return str(self.name)
 
 
+class StoredBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Stored file")
+        verbose_name_plural = _("Stored files")
+
+    def __str__(self):
+        return "{} ({})".format(self.name, self.references)
+
+
+class UploadedPart(File):
+    """An assembled upload that storages may move into place instead of copying.
+
+    The part file stays until the handout is committed, so it is moved then.
+    """
+
+    move_on_commit = True
+
+    def __init__(self, file, sha256=None):
+        super().__init__(file)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class ChunkError(Exception):
+    pass
+
+
+class HandoutUpload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = managers.HandoutUploadManager()
+
+    class Meta:
+        verbose_name = _("Handout upload")
+        verbose_name_plural = _("Handout uploads")
+
+    def __str__(self):
+        return "{}: {} ({}/{})".format(
+            self.course, self.filename, self.offset, self.size
+        )
+
+    @property
+    def path(self):
+        return os.path.join(settings.HANDOUT_UPLOAD_DIR, f"{self.pk}.part")
+
+    @property
+    def offset(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def write_chunk(self, stream, length, checksum=None):
+        """Append ``length`` bytes read from ``stream`` to the part file.
+
+        The chunk is copied in small blocks so it is never held in memory as a
+        whole. On a short read or a checksum mismatch the part file is rolled
+        back to its previous size, so the client can simply resend the chunk.
+        """
+        os.makedirs(settings.HANDOUT_UPLOAD_DIR, exist_ok=True)
+        offset = self.offset
+        digest = hashlib.sha256()
+        with open(self.path, "ab") as part:
+            remaining = length
+            while remaining > 0:
+                data = stream.read(min(settings.HANDOUT_UPLOAD_BLOCK_SIZE, remaining))
+                if not data:
+                    break
+                part.write(data)
+                digest.update(data)
+                remaining -= len(data)
+            if remaining:
+                part.truncate(offset)
+                raise ChunkError(_("Incomplete chunk."))
+            if checksum and digest.hexdigest() != checksum.lower():
+                part.truncate(offset)
+                raise ChunkError(_("Chunk checksum mismatch."))
+
+    def verify(self):
+        digest = hashlib.sha256()
+        with open(self.path, "rb") as part:
+            for block in iter(
+                lambda: part.read(settings.HANDOUT_UPLOAD_BLOCK_SIZE), b""
+            ):
+                digest.update(block)
+        return digest.hexdigest() == self.checksum.lower()
+
+    def assemble(self, handout):
+        # verify() hashed the part, the storage can trust its checksum
+        with open(self.path, "rb") as part:
+            handout.attachment.save(
+                self.filename, UploadedPart(part, self.checksum), save=False
+            )
+
+    def discard(self):
+        # The part is removed by the post_delete receiver
+        self.delete()
+
+
 class JoinRequest(models.Model):
     center = models.ForeignKey(Center, on_delete=models.CASCADE)
     professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
@@ -254,6 +427,27 @@ class JoinRequest(models.Model):
         verbose_name_plural = _("Join requests")
         permissions = (("manage_join_request", _("Manage join request")),)
         unique_together = ("center", "professor")
+        indexes = [
+            models.Index(
+                fields=["center", "accepted"], name="joinrequest_center_accepted"
+            ),
+            models.Index(
+                fields=["professor", "accepted"], name="joinrequest_prof_accepted"
+            ),
+        ]
 
     def __str__(self):
         return "{}: {} ({})".format(self.center, self.professor, self.accepted)
+
+
+class LifecycleRun(models.Model):
+    """Time of the last complete ``updatelifecycle`` run, in a single row."""
+
+    ran_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _("Lifecycle run")
+        verbose_name_plural = _("Lifecycle runs")
+
+    def __str__(self):
+        return str(self.ran_at)
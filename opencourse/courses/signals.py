@@ -0,0 +1,57 @@
+import os
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from opencourse.core.images import delete_picture, enqueue_renditions, replace_picture
+from . import models
+
+
+@receiver(pre_save, sender=models.Handout)
+def release_replaced_attachment(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list("attachment", flat=True)
+        .first()
+    )
+    if previous and previous != instance.attachment.name:
+        instance.attachment.storage.delete(previous)
+
+
+@receiver(post_delete, sender=models.Handout)
+def release_attachment(sender, instance, **kwargs):
+    if instance.attachment:
+        instance.attachment.delete(save=False)
+
+
+@receiver(pre_save, sender=models.Center)
+def release_replaced_picture(sender, instance, update_fields=None, **kwargs):
+    instance._picture_changed = replace_picture(instance, update_fields)
+
+
+@receiver(post_save, sender=models.Center)
+def queue_picture_renditions(sender, instance, **kwargs):
+    if instance._picture_changed:
+        enqueue_renditions(instance.picture)
+
+
+@receiver(post_delete, sender=models.Center)
+def delete_center_picture(sender, instance, **kwargs):
+    name, storage = instance.picture.name, instance.picture.storage
+    transaction.on_commit(lambda: delete_picture(name, storage))
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@receiver(post_delete, sender=models.HandoutUpload)
+def remove_upload_part(sender, instance, **kwargs):
+    path = instance.path
+    transaction.on_commit(lambda: remove_file(path))
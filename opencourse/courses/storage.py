@@ -0,0 +1,150 @@
+import glob
+import hashlib
+import os
+import tempfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage that keeps a single copy of every distinct content.
+
+    Blobs are named after the SHA-256 of their content, which is computed while
+    the upload is streamed to a staging file. Saving content that is already
+    stored only bumps the reference count of its ``StoredBlob`` and deleting a
+    file releases one reference; the blob is removed with the last one.
+
+    Saved names keep the extension of the upload, so the files are served with
+    their type. The same content saved with different extensions is stored once
+    and hard linked under each name.
+
+    Names outside ``prefix`` (files stored before this backend) are handled
+    like a regular ``FileSystemStorage``.
+    """
+
+    prefix = "handouts/sha256"
+
+    @property
+    def blob_model(self):
+        return apps.get_model("courses", "StoredBlob")
+
+    def blob_name(self, digest):
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def _blob_paths(self, blob_name):
+        # The blob's files, one per extension it was saved with
+        return glob.glob(glob.escape(self.path(blob_name)) + "*")
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content only, see _save().
+        return name
+
+    def _stage(self, content):
+        staging = self.path(os.path.join(self.prefix, "staging"))
+        os.makedirs(staging, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, path = tempfile.mkstemp(dir=staging)
+        with os.fdopen(fd, "wb") as staged:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                staged.write(chunk)
+        return path, digest.hexdigest()
+
+    def _hash(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(settings.HANDOUT_UPLOAD_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _save(self, name, content):
+        if hasattr(content, "temporary_file_path"):
+            # The owner of a temporary file removes it if it is not moved.
+            path, owned = content.temporary_file_path(), False
+            digest = getattr(content, "sha256", None) or self._hash(path)
+        else:
+            (path, digest), owned = self._stage(content), True
+
+        blob_name = self.blob_name(digest)
+        name = blob_name + os.path.splitext(name)[1].lower()
+        with transaction.atomic():
+            blob, created = self.blob_model.objects.select_for_update().get_or_create(
+                name=blob_name,
+                defaults={"digest": digest, "size": os.path.getsize(path)},
+            )
+            if getattr(content, "move_on_commit", False):
+                # The file outlives the request: moving it once the reference
+                # is committed leaves it in place if the transaction rolls back.
+                transaction.on_commit(lambda: self._place(path, name, owned=True))
+            else:
+                self._place(path, name, owned)
+            blob.references = F("references") + 1
+            blob.save(update_fields=["references"])
+        return name
+
+    def _place(self, path, name, owned):
+        full_path = self.path(name)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            stored = self._blob_paths(os.path.splitext(name)[0])
+            try:
+                if stored:
+                    os.link(stored[0], full_path)
+                else:
+                    file_move_safe(path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+                    return
+            except FileExistsError:
+                # Placed by a concurrent save of the same content
+                pass
+        if owned:
+            os.remove(path)
+
+    def delete(self, name):
+        # Files are unlinked once the deletion is committed, a rolled back
+        # transaction still has them.
+        if not name.startswith(self.prefix + "/"):
+            transaction.on_commit(
+                lambda: super(ContentAddressedStorage, self).delete(name)
+            )
+            return
+        blob_name = os.path.splitext(name)[0]
+        with transaction.atomic():
+            blob = (
+                self.blob_model.objects.select_for_update()
+                .filter(name=blob_name, references__gt=0)
+                .first()
+            )
+            if blob is None:
+                return
+            if blob.references == 1:
+                # The row is kept, without references, until _unlink() is done
+                transaction.on_commit(lambda: self._unlink(blob_name))
+            blob.references = F("references") - 1
+            blob.save(update_fields=["references"])
+
+    def _unlink(self, blob_name):
+        with transaction.atomic():
+            # The row stays locked until the files are gone, so a concurrent
+            # save of the same content waits, then stores them again.
+            blob = (
+                self.blob_model.objects.select_for_update()
+                .filter(name=blob_name, references=0)
+                .first()
+            )
+            if blob is None:
+                return
+            for path in self._blob_paths(blob_name):
+                os.remove(path)
+            blob.delete()
+
+
+handout_storage = ContentAddressedStorage()
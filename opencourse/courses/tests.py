@@ -1,3 +1,1247 @@
-from django.test import TestCase
+import csv
+import hashlib
+import importlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db import DatabaseError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone, translation
+from guardian.models import UserObjectPermission
+from PIL import Image
+
+from opencourse.core import images
+from opencourse.core import paginator as paginator_module
+from opencourse.core.admin import BackgroundDeleteAdmin
+from opencourse.core.cache import TieredCache
+from opencourse.core.db import routers
+from opencourse.core.deletion import Cascade, schedule_deletion
+from opencourse.core.instrumentation import QueryBudgetExceeded
+from opencourse.core.management.commands import processimages
+from opencourse.core.models import DeletionJob, ImageJob
+from opencourse.core.paginator import ApproximateCountPaginator
+from opencourse.core.testing import assert_query_budget
+from opencourse.profiles.models import Professor, Review, Student, User
+
+from . import forms, lifecycle, models, transfer, views
+from .storage import handout_storage
+
+
+def create_user(username, permission, profile_class):
+    user = User.objects.create_user(username, f"{username}@example.com", "password")
+    user.user_permissions.add(Permission.objects.get(codename=permission))
+    profile = profile_class.objects.create(user=user, tel="0")
+    return user, profile
+
+
+class QueryBudgetTests(TestCase):
+    """The views' queries must not grow with the number of rows shown."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.professor = create_user(
+            "professor", "access_professor_pages", Professor
+        )
+        cls.center = models.Center.objects.create(admin=cls.professor, name="Center")
+        city = models.City.objects.create(name="City")
+        area = models.CourseArea.objects.create(name="Area")
+        location_type = models.CourseLocationType.objects.create(name="Home")
+        currency = models.Currency.objects.create(symbol="$")
+        students = [
+            create_user(f"student{i}", "access_student_pages", Student)[1]
+            for i in range(5)
+        ]
+        student_type = ContentType.objects.get_for_model(Student)
+        for i in range(5):
+            course = models.Course.objects.create(
+                professor=cls.professor, center=cls.center, city=city, title=str(i)
+            )
+            course.area.add(area)
+            models.CourseLocation.objects.create(
+                course=course, location_type=location_type, currency=currency, price=1
+            )
+            for student in students:
+                models.Enrollment.objects.create(
+                    course=course, student=student, accepted=True
+                )
+            Review.objects.create(
+                professor=cls.professor,
+                score=5,
+                text="",
+                content_type=student_type,
+                author_id=students[i].pk,
+            )
+        cls.course = course
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_course_detail(self):
+        url = reverse("courses:detail", args=[self.course.pk])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_course_detail_student(self):
+        user = models.Enrollment.objects.filter(course=self.course)[0].student.user
+        self.client.force_login(user)
+        url = reverse("courses:detail", args=[self.course.pk])
+        self.assertContains(self.client.get(url), 'id="enrollment-form"')
+
+    def test_center_detail(self):
+        url = reverse("courses:centers:detail", args=[self.center.pk])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_enrollment_professor_list(self):
+        url = reverse("courses:enrollments:professor_list")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_exceeded_budget_fails(self):
+        url = reverse("courses:enrollments:professor_list")
+        budget = views.EnrollmentProfessorListView.query_budget
+        budget_queries, budget.queries = budget.queries, 1
+        try:
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(url)
+        finally:
+            budget.queries = budget_queries
+
+    def test_assert_query_budget(self):
+        with assert_query_budget(queries=1) as recorder:
+            models.Course.objects.count()
+        self.assertEqual(recorder.count, 1)
+        with self.assertRaises(AssertionError):
+            with assert_query_budget(queries=1, duplicates=0):
+                models.Course.objects.count()
+                models.Course.objects.count()
+
+
+class RosterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.professor = create_user(
+            "professor", "access_professor_pages", Professor
+        )
+        cls.course = models.Course.objects.create(
+            professor=cls.professor, title="Algebra"
+        )
+        other = models.Course.objects.create(professor=cls.professor, title="Physics")
+        for i, accepted in enumerate((True, False, None)):
+            user, student = create_user(f"student{i}", "access_student_pages", Student)
+            User.objects.filter(pk=user.pk).update(last_name=str(i))
+            models.Enrollment.objects.create(
+                course=cls.course, student=student, accepted=accepted
+            )
+        student.city = "=HYPERLINK(1)"
+        student.address = "@SUM(1)"
+        student.save()
+        models.Enrollment.objects.create(course=other, student=student)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def rows(self, response):
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_course_roster(self):
+        response = self.client.get(reverse("courses:roster", args=[self.course.pk]))
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="algebra.csv"', response["Content-Disposition"])
+        header, *rows = self.rows(response)
+        self.assertEqual(header[0], "Course")
+        self.assertEqual(header[-1], "Status")
+        self.assertEqual(
+            [(row[1], row[-1]) for row in rows],
+            [
+                ("student0", "Accepted"),
+                ("student1", "Rejected"),
+                ("student2", "Pending"),
+            ],
+        )
+        self.assertEqual(rows[-1][-3:-1], ["'@SUM(1)", "'=HYPERLINK(1)"])
+
+    def test_professor_roster(self):
+        response = self.client.get(reverse("courses:enrollments:professor_roster"))
+        self.assertIn('filename="enrollments.csv"', response["Content-Disposition"])
+        courses = [row[0] for row in self.rows(response)[1:]]
+        self.assertEqual(courses, ["Algebra"] * 3 + ["Physics"])
+
+    def test_other_professors_course(self):
+        user = create_user("other", "access_professor_pages", Professor)[0]
+        self.client.force_login(user)
+        url = reverse("courses:roster", args=[self.course.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse("courses:enrollments:professor_roster")
+        self.assertEqual(self.rows(self.client.get(url))[1:], [])
+
+        self.client.force_login(User.objects.get(username="student0"))
+        url = reverse("courses:roster", args=[self.course.pk])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=["replica0"])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Checks where the queries would go, through QuerySet.db, without the
+    replica being configured. Not a TestCase, whose transaction would keep
+    every read on the primary.
+    """
+
+    def request(self, view, method="get", cookies=None):
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        databases = []
+
+        def get_response(request):
+            databases.append(view())
+            return HttpResponse()
+
+        response = routers.ReplicaMiddleware(get_response)(request)
+        return databases[0], response
+
+    def read(self):
+        return models.Course.objects.all().db
+
+    def test_safe_request_reads_from_the_replica(self):
+        database, response = self.request(self.read)
+        self.assertEqual(database, "replica0")
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.read(), "default")
+
+    def test_write_sets_the_sticky_cookie(self):
+        def write():
+            models.City.objects.create(name="City")
+            return self.read()
+
+        database, response = self.request(write)
+        self.assertEqual(database, "default")
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_STICKY_SECONDS)
+
+        database, response = self.request(self.read, "post")
+        self.assertEqual(database, "default")
+
+    def test_sticky_client_reads_from_the_primary(self):
+        cookies = {settings.REPLICA_STICKY_COOKIE: "1"}
+        database, response = self.request(self.read, cookies=cookies)
+        self.assertEqual(database, "default")
+
+    def test_atomic_block_reads_from_the_primary(self):
+        def read_in_atomic():
+            outside = self.read()
+            with transaction.atomic():
+                return outside, self.read()
+
+        (outside, inside), response = self.request(read_in_atomic)
+        self.assertEqual((outside, inside), ("replica0", "default"))
+
+
+class TranslationPruningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user, professor = create_user("professor", "access_professor_pages", Professor)
+        city = models.City.objects.create(name_fr="Alger", name_ar="الجزائر")
+        models.Course.objects.create(professor=professor, city=city)
+
+    def columns(self, queryset):
+        with CaptureQueriesContext(connection) as queries:
+            result = list(queryset)
+        sql = queries[0]["sql"]
+        return (
+            result,
+            {name for name in ("name_fr", "name_en", "name_ar") if name in sql},
+        )
+
+    def test_model(self):
+        queryset = models.City.objects.all()
+        with translation.override("fr"):
+            cities, columns = self.columns(queryset)
+            self.assertEqual(cities[0].name, "Alger")
+        self.assertEqual(columns, {"name_fr", "name_en"})
+        # The queryset itself still selects every column
+        self.assertIn("name_ar", str(queryset.query))
+        with translation.override("ar"):
+            cities, columns = self.columns(models.City.objects.all())
+            self.assertEqual(cities[0].name, "الجزائر")
+        self.assertEqual(columns, {"name_fr", "name_en", "name_ar"})
+
+    def test_select_related(self):
+        with translation.override("fr"):
+            courses, columns = self.columns(
+                models.Course.objects.select_related("city")
+            )
+            self.assertEqual(courses[0].city.name, "Alger")
+        self.assertEqual(columns, {"name_fr", "name_en"})
+        with translation.override("ar"):
+            _, columns = self.columns(models.Course.objects.select_related("city"))
+        self.assertEqual(columns, {"name_fr", "name_en", "name_ar"})
+
+    def test_explicit_columns(self):
+        with translation.override("fr"):
+            _, columns = self.columns(models.City.objects.only("name_ar"))
+            self.assertEqual(columns, {"name_ar"})
+            _, columns = self.columns(models.City.objects.all().all_languages())
+            self.assertEqual(columns, {"name_fr", "name_en", "name_ar"})
+            with CaptureQueriesContext(connection) as queries:
+                list(models.City.objects.iterator())
+            self.assertNotIn("name_ar", queries[0]["sql"])
+
+
+class IndexUsageTests(TestCase):
+    """The hot lookups must be served by the indexes designed for them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generatedata",
+            courses=300,
+            professors=30,
+            students=200,
+            stdout=io.StringIO(),
+        )
+        rng = random.Random(0)
+        courses = list(models.Course.objects.all())
+        sections = list(models.HandoutSection.objects.all())
+        models.Handout.objects.bulk_create(
+            models.Handout(
+                course=course,
+                name=str(i),
+                attachment=f"handouts/{course.pk}-{i}.pdf",
+                section=rng.choice(sections),
+            )
+            for course in courses
+            for i in range(3)
+        )
+        now = timezone.now()
+        # Expired courses pile up, active ones are the few recent ones
+        for course in courses:
+            course.dateexp = now + timedelta(days=rng.randint(-300, 30))
+        models.Course.objects.bulk_update(courses, ["dateexp"])
+        list(lifecycle.update_flags(now - timedelta(days=400), now))
+        centers = list(models.Center.objects.all())
+        models.JoinRequest.objects.bulk_create(
+            models.JoinRequest(center=center, professor=professor, accepted=True)
+            for professor in Professor.objects.all()
+            for center in rng.sample(centers, 2)
+            if center.admin_id != professor.pk
+        )
+        cls.student = Student.objects.filter(enrollment__isnull=False).first()
+        cls.professor = Professor.objects.filter(review__isnull=False).first()
+        cls.course = models.Course.objects.filter(center__isnull=False).first()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            if connection.vendor == "postgresql":
+                # The planner scans tables this small sequentially
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, f"{queryset.query}\n{plan}")
+
+    def test_student_enrollments(self):
+        self.assertUsesIndex(
+            models.Enrollment.objects.filter(student=self.student, accepted=True),
+            "enrollment_student_accepted",
+        )
+
+    def test_course_students(self):
+        self.assertUsesIndex(
+            models.Enrollment.objects.filter(course=self.course, accepted=True),
+            "enrollment_course_accepted",
+        )
+
+    def test_center_members(self):
+        self.assertUsesIndex(
+            models.JoinRequest.objects.filter(center=self.course.center, accepted=True),
+            "joinrequest_center_accepted",
+        )
+
+    def test_professor_centers(self):
+        self.assertUsesIndex(
+            models.JoinRequest.objects.filter(professor=self.professor, accepted=True),
+            "joinrequest_prof_accepted",
+        )
+
+    def test_latest_reviews(self):
+        self.assertUsesIndex(
+            self.professor.review_set.order_by("-id")[: views.REVIEW_COUNT],
+            "review_professor_id",
+        )
+
+    def test_handouts_by_section(self):
+        self.assertUsesIndex(
+            self.course.handout_set.order_by("section", "pk"), "handout_course_section"
+        )
+
+    def test_search_results(self):
+        courses = views.CourseSearchResultsView().get_queryset()
+        self.assertUsesIndex(courses[:10], "course_active_id")
+        self.assertUsesIndex(
+            courses.filter(city=self.course.city)[:10], "course_active_city"
+        )
+
+    def test_center_courses(self):
+        self.assertUsesIndex(
+            models.Course.objects.filter(center=self.course.center, active=True),
+            "course_center_active",
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "UPPER() indexes are PostgreSQL's")
+    def test_admin_search(self):
+        self.assertUsesIndex(
+            models.Course.objects.filter(title__istartswith="co"), "course_title_upper"
+        )
+        self.assertUsesIndex(
+            User.objects.filter(email__iexact="professor0@example.com"),
+            "user_email_upper",
+        )
+
+    def test_expired_courses(self):
+        self.assertUsesIndex(
+            models.Course.objects.filter(dateexp__lt=timezone.now()), "course_dateexp"
+        )
+
+
+class MediaTestCase(TransactionTestCase):
+    data = b"handout " * 1000
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        upload_dir = os.path.join(media_root, "uploads")
+        settings = override_settings(
+            MEDIA_ROOT=media_root,
+            HANDOUT_UPLOAD_DIR=upload_dir,
+            HANDOUT_UPLOAD_CHUNK_SIZE=1000,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        user, professor = create_user("professor", "access_professor_pages", Professor)
+        self.client.force_login(user)
+        self.course = models.Course.objects.create(professor=professor, title="Course")
+        self.section = models.HandoutSection.objects.create(name="Section")
+
+
+class HandoutUploadTests(MediaTestCase):
+    def start(self, data):
+        url = reverse(
+            "courses:handouts:upload_create", kwargs={"course_pk": self.course.pk}
+        )
+        checksum = hashlib.sha256(data).hexdigest()
+        response = self.client.post(
+            url, {"filename": "notes.txt", "size": len(data), "checksum": checksum}
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, status, chunk, offset=None, checksum=None):
+        return self.client.put(
+            status["url"],
+            chunk,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(status["offset"] if offset is None else offset),
+            HTTP_UPLOAD_CHECKSUM=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def send(self, status, data):
+        while status["offset"] < status["size"]:
+            chunk = data[status["offset"] : status["offset"] + status["chunk_size"]]
+            response = self.put(status, chunk)
+            self.assertEqual(response.status_code, 200)
+            status = response.json()
+        return status
+
+    def complete(self, status):
+        return self.client.post(
+            status["complete_url"], {"name": "Notes", "section": self.section.pk}
+        )
+
+    def test_upload(self):
+        status = self.start(self.data)
+        chunk = self.data[:1000]
+        self.assertEqual(self.put(status, chunk, offset=1000).status_code, 409)
+        self.assertEqual(self.put(status, chunk, checksum="0" * 64).status_code, 400)
+        upload = models.HandoutUpload.objects.get()
+        self.assertEqual(upload.offset, 0)
+
+        status = self.send(status, self.data)
+        self.assertEqual(status["offset"], len(self.data))
+        self.assertEqual(self.complete(status).status_code, 200)
+
+        handout = models.Handout.objects.get()
+        with handout.attachment.open() as attachment:
+            self.assertEqual(attachment.read(), self.data)
+        self.assertFalse(os.path.exists(upload.path))
+        self.assertFalse(models.HandoutUpload.objects.exists())
+
+    def test_checksum_mismatch(self):
+        status = self.start(self.data)
+        status = self.send(status, self.data[::-1])
+        self.assertEqual(self.complete(status).status_code, 400)
+        self.assertFalse(models.Handout.objects.exists())
+        self.assertFalse(models.HandoutUpload.objects.exists())
+
+    def test_failed_save_keeps_the_upload(self):
+        status = self.start(self.data)
+        status = self.send(status, self.data)
+        upload = models.HandoutUpload.objects.get()
+        with mock.patch.object(
+            forms.HandoutUploadCompleteForm, "save", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.complete(status)
+        self.assertTrue(os.path.exists(upload.path))
+        self.assertFalse(models.StoredBlob.objects.exists())
+
+        # The client can complete the upload again
+        self.assertEqual(self.complete(status).status_code, 200)
+        self.assertEqual(models.Handout.objects.get().attachment.size, len(self.data))
+
+    def test_stored_content_is_uploaded_again(self):
+        handout = models.Handout(course=self.course, section=self.section)
+        handout.attachment.save("notes.txt", ContentFile(self.data))
+
+        # Knowing the checksum of stored content is not enough to reference it
+        status = self.start(self.data)
+        self.assertEqual(status["offset"], 0)
+        status = self.send(status, self.data[::-1])
+        self.assertEqual(self.complete(status).status_code, 400)
+
+        status = self.send(self.start(self.data), self.data)
+        self.assertEqual(self.complete(status).status_code, 200)
+        blob = models.StoredBlob.objects.get()
+        self.assertEqual(blob.references, 2)
+
+
+class HandoutStorageTests(MediaTestCase):
+    def create_handout(self, data, name="notes.txt"):
+        handout = models.Handout(course=self.course, section=self.section)
+        handout.attachment.save(name, ContentFile(data))
+        return handout
+
+    def blob(self, handout):
+        name = os.path.splitext(handout.attachment.name)[0]
+        return models.StoredBlob.objects.get(name=name)
+
+    def test_reference_counting(self):
+        first = self.create_handout(self.data)
+        second = self.create_handout(self.data)
+        other = self.create_handout(self.data[::-1])
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        self.assertNotEqual(first.attachment.name, other.attachment.name)
+        blob = self.blob(first)
+        self.assertEqual(blob.references, 2)
+
+        path = first.attachment.path
+        first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.references, 1)
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        self.assertFalse(models.StoredBlob.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(other.attachment.path))
+
+    def test_replaced_attachment_is_released(self):
+        handout = self.create_handout(self.data)
+        path = handout.attachment.path
+        handout.attachment.save("notes.txt", ContentFile(self.data[::-1]))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(models.StoredBlob.objects.get().references, 1)
+
+    def test_rollback_keeps_the_file(self):
+        handout = self.create_handout(self.data)
+        path = handout.attachment.path
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                handout.delete()
+                raise DatabaseError
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(models.StoredBlob.objects.get().references, 1)
+
+    def test_extensions_share_the_blob(self):
+        text = self.create_handout(self.data)
+        pdf = self.create_handout(self.data, "notes.PDF")
+        self.assertTrue(pdf.attachment.name.endswith(".pdf"))
+        self.assertEqual(self.blob(text), self.blob(pdf))
+        self.assertEqual(self.blob(text).references, 2)
+        self.assertTrue(os.path.samefile(text.attachment.path, pdf.attachment.path))
+
+        paths = text.attachment.path, pdf.attachment.path
+        text.delete()
+        pdf.delete()
+        self.assertFalse(models.StoredBlob.objects.exists())
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_content_stored_again_before_the_unlink(self):
+        handout = self.create_handout(self.data)
+        path, storage = handout.attachment.path, handout.attachment.storage
+        blob_name = self.blob(handout).name
+        # The last reference is released, the unlink has not run yet
+        with mock.patch.object(transaction, "on_commit"):
+            handout.delete()
+        self.assertEqual(models.StoredBlob.objects.get().references, 0)
+
+        again = self.create_handout(self.data)
+        storage._unlink(blob_name)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.blob(again).references, 1)
+
+    def test_blobs_renamed_after_their_digest(self):
+        migration = importlib.import_module(
+            "opencourse.courses.migrations.0014_storedblob_digest_name"
+        )
+        digest = hashlib.sha256(self.data).hexdigest()
+        for extension, references in ((".txt", 2), (".pdf", 1)):
+            models.StoredBlob.objects.create(
+                name=f"handouts/sha256/{digest[:2]}/{digest[2:4]}/{digest}{extension}",
+                digest=digest,
+                size=len(self.data),
+                references=references,
+            )
+        migration.name_after_digest(apps, None)
+        blob = models.StoredBlob.objects.get()
+        self.assertEqual(blob.name, handout_storage.blob_name(digest))
+        self.assertEqual(blob.references, 3)
+
+
+class CenterPictureTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.center = models.Center.objects.create(
+            admin=self.course.professor, name="Center"
+        )
+
+    def picture(self, color):
+        output = io.BytesIO()
+        Image.new("RGB", (64, 64), color).save(output, "PNG")
+        return ContentFile(output.getvalue())
+
+    def test_renditions_are_queued_when_the_picture_changes(self):
+        self.center.picture.save("center.png", self.picture("red"))
+        job = ImageJob.objects.get()
+        self.assertEqual(job.name, self.center.picture.name)
+
+        job.delete()
+        self.center.save()
+        self.center.save(update_fields=["name"])
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_picture_reuploaded_under_the_same_name(self):
+        self.center.picture.save("center.png", self.picture("red"))
+        name = self.center.picture.name
+        ImageJob.objects.update(status=ImageJob.DONE, attempts=1)
+        models.Center.objects.filter(pk=self.center.pk).delete()
+        self.assertFalse(ImageJob.objects.exists())
+
+        center = models.Center.objects.create(admin=self.course.professor)
+        center.picture.save("center.png", self.picture("blue"))
+        self.assertEqual(center.picture.name, name)
+        self.assertEqual(ImageJob.objects.get(name=name).status, ImageJob.PENDING)
+
+    def test_job_starts_over_for_a_new_picture(self):
+        self.center.picture.save("center.png", self.picture("red"))
+        ImageJob.objects.update(status=ImageJob.FAILED, attempts=3)
+        images.enqueue_renditions(self.center.picture)
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ImageJob.PENDING, 0))
+
+    def test_replaced_picture_is_deleted(self):
+        self.center.picture.save("center.png", self.picture("red"))
+        previous = self.center.picture.name
+        images.generate_renditions(previous)
+        self.assertTrue(images.has_renditions(self.center.picture))
+
+        self.center.picture.save("center.png", self.picture("blue"))
+        storage = self.center.picture.storage
+        self.assertFalse(storage.exists(previous))
+        for _, _, rendition in images.renditions(previous):
+            self.assertFalse(storage.exists(rendition))
+        self.assertTrue(storage.exists(self.center.picture.name))
+        self.assertEqual(ImageJob.objects.get().name, self.center.picture.name)
+
+    def test_picture_is_deleted_on_commit(self):
+        self.center.picture.save("center.png", self.picture("red"))
+        storage, name = self.center.picture.storage, self.center.picture.name
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                models.Center.objects.filter(pk=self.center.pk).delete()
+                raise DatabaseError
+        self.assertTrue(storage.exists(name))
+
+        models.Center.objects.filter(pk=self.center.pk).delete()
+        self.assertFalse(storage.exists(name))
+
+    def test_form_checks_the_picture(self):
+        data = {"name": "Center"}
+        picture = SimpleUploadedFile("center.png", self.picture("red").read())
+        form = forms.CenterForm(data, {"picture": picture})
+        self.assertTrue(form.is_valid(), form.errors)
+
+        picture = SimpleUploadedFile("center.png", b"not an image")
+        form = forms.CenterForm(data, {"picture": picture})
+        self.assertEqual(form.errors.as_data()["picture"][0].code, "invalid_image")
+
+        self.center.picture.save("center.png", self.picture("red"))
+        picture = SimpleUploadedFile("center.png", self.picture("red").read())
+        with self.settings(IMAGE_MAX_PIXELS=64 * 63):
+            form = forms.CenterForm(data, {"picture": picture})
+            self.assertEqual(form.errors.as_data()["picture"][0].code, "too_large")
+            with self.assertRaises(Image.DecompressionBombError):
+                images.generate_renditions(self.center.picture.name)
+
+    def test_undecodable_picture_is_discarded(self):
+        self.center.picture.save("center.png", ContentFile(b"not an image"))
+        name, storage = self.center.picture.name, self.center.picture.storage
+        job = ImageJob.objects.get()
+        job.attempts = processimages.MAX_ATTEMPTS
+        future = Future()
+        future.set_exception(OSError("cannot identify image file"))
+        processimages.Command(stderr=io.StringIO()).finish(job, future)
+
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.FAILED)
+        self.assertFalse(storage.exists(name))
+        self.center.refresh_from_db()
+        self.assertFalse(self.center.picture)
+
+    def test_broken_pool_is_rebuilt(self):
+        for name in ("first.png", "second.png"):
+            ImageJob.objects.create(name=name)
+        calls = []
+
+        def generate(name):
+            calls.append(name)
+            if len(calls) == 1:
+                raise BrokenProcessPool("A worker was killed")
+
+        command = processimages.Command(stderr=io.StringIO())
+        with mock.patch.object(processimages, "generate_renditions", generate):
+            with mock.patch.object(
+                command, "executor", side_effect=lambda n: ThreadPoolExecutor(n)
+            ) as executor:
+                command.handle(workers=1, once=True, poll=0.1)
+        self.assertEqual(executor.call_count, 2)
+        self.assertEqual(
+            set(ImageJob.objects.values_list("status", "attempts")),
+            {(ImageJob.DONE, 1), (ImageJob.DONE, 2)},
+        )
+
+
+REDIS_DOWN = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://127.0.0.1:1/0",
+        "OPTIONS": {"IGNORE_EXCEPTIONS": True, "SOCKET_CONNECT_TIMEOUT": 0.1},
+    }
+}
+
+
+@override_settings(TIERED_CACHE_VERSION_TTL=0)
+class TieredCacheTests(TestCase):
+    """Two TieredCache instances stand for two processes sharing the cache."""
+
+    def setUp(self):
+        caches["default"].clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_local_hit(self):
+        cache = TieredCache()
+        self.assertEqual(cache.get_or_set("key", self.compute, 60), 1)
+        self.assertEqual(cache.get_or_set("key", self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache.counters["l1_hits"], 1)
+
+    def test_shared_hit(self):
+        first, second = TieredCache(), TieredCache()
+        first.get_or_set("key", self.compute, 60)
+        self.assertEqual(second.get_or_set("key", self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second.counters["l2_hits"], 1)
+
+    def test_invalidation(self):
+        first, second = TieredCache(), TieredCache()
+        first.get_or_set("key", self.compute, 60, namespace="ns")
+        second.get_or_set("key", self.compute, 60, namespace="ns")
+        first.invalidate("ns")
+        self.assertEqual(second.get_or_set("key", self.compute, 60, namespace="ns"), 2)
+        self.assertEqual(first.get_or_set("key", self.compute, 60, namespace="ns"), 2)
+
+    @override_settings(CACHES=REDIS_DOWN)
+    def test_redis_down(self):
+        cache = TieredCache()
+        with self.assertLogs("opencourse.core.cache", "WARNING"):
+            self.assertEqual(cache.get_or_set("key", self.compute, 60), 1)
+            cache.invalidate()
+        self.assertEqual(cache.counters["lock_waits"], 0)
+        self.assertEqual(cache.get_or_set("key", self.compute, 60), 1)
+        self.assertEqual(cache.counters["l1_hits"], 1)
+
+    def test_facets(self):
+        models.City.objects.create(name="Old town")
+        url = reverse("courses:search_results")
+        self.assertContains(self.client.get(url), "Old town")
+        list(forms.CourseSearchForm().fields["city"].choices)
+        with self.assertNumQueries(0):
+            choices = list(forms.CourseSearchForm().fields["city"].choices)
+        self.assertEqual(choices[1][1], "Old town")
+
+        models.City.objects.create(name="New town")
+        self.assertContains(self.client.get(url), "New town")
+
+
+class PaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.professor = create_user(
+            "professor", "access_professor_pages", Professor
+        )
+        models.Course.objects.bulk_create(
+            models.Course(professor=cls.professor, title=f"Course {i}", active=True)
+            for i in range(12)
+        )
+
+    def paginator(self, threshold, per_page=10):
+        queryset = models.Course.objects.order_by("pk")
+        paginator = ApproximateCountPaginator(queryset, per_page)
+        paginator.threshold = threshold
+        return paginator
+
+    def test_exact(self):
+        paginator = self.paginator(20)
+        self.assertEqual((paginator.count, paginator.exact), (12, True))
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertFalse(paginator.page(2).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+
+        paginator = ApproximateCountPaginator(list(range(12)), 10)
+        self.assertEqual((paginator.count, paginator.exact), (12, True))
+
+    def test_capped(self):
+        paginator = self.paginator(5, per_page=4)
+        self.assertEqual((paginator.count, paginator.exact), (5, False))
+        self.assertFalse(paginator.estimated)
+        # Pages past the counted rows
+        self.assertEqual(paginator.validate_number(3), 3)
+        page = paginator.page(3)
+        self.assertEqual(len(page), 4)
+        self.assertFalse(page.has_next())
+        self.assertEqual((page.start_index(), page.end_index()), (9, 12))
+        self.assertTrue(paginator.page(2).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+        with self.assertRaises(EmptyPage):
+            paginator.validate_number(0)
+
+    def test_estimated(self):
+        with mock.patch.object(paginator_module, "estimate_count", return_value=100):
+            paginator = self.paginator(5)
+            self.assertEqual((paginator.count, paginator.exact), (100, False))
+            self.assertTrue(paginator.estimated)
+        with mock.patch.object(paginator_module, "estimate_count", return_value=3):
+            self.assertEqual(self.paginator(5).count, 5)
+
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=5)
+    def test_search_results(self):
+        url = reverse("courses:search_results")
+        response = self.client.get(url)
+        self.assertContains(response, "5+ results")
+        self.assertNotContains(response, '<a href="?page=2">2</a>')
+        self.assertContains(response, '<a href="?page=2">&raquo;</a>')
+
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(len(response.context["object_list"]), 2)
+        self.assertFalse(response.context["page_obj"].has_next())
+        self.assertEqual(self.client.get(url, {"page": 3}).status_code, 404)
+
+
+class CourseImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.professor = create_user(
+            "professor", "access_professor_pages", Professor
+        )
+        models.City.objects.create(name="Paris", codepostal="75000")
+        models.CourseArea.objects.create(name="Music")
+        models.CourseLocationType.objects.create(name="Home")
+        models.Currency.objects.create(name="Euro", iso_code="EUR", symbol="€")
+
+    def record(self, title, **fields):
+        record = {
+            "title": title,
+            "descrip": "Description",
+            "city": "75000",
+            "areas": ["music"],
+            "locations": [{"type": "Home", "price": 10, "currency": "EUR"}],
+        }
+        record.update(fields)
+        return json.dumps(record)
+
+    def run_import(self, lines, **kwargs):
+        importer = transfer.CourseImporter(self.professor, **kwargs)
+        return importer.run(transfer.FORMATS["jsonl"], io.StringIO("\n".join(lines)))
+
+    def test_invalid_records_are_reported(self):
+        importer = self.run_import(
+            [
+                self.record("Valid"),
+                self.record("Unknown city", city="Nowhere"),
+                "[]",
+                self.record("", locations=[{"type": "Home", "price": 10}]),
+            ]
+        )
+        self.assertEqual(importer.created, 1)
+        self.assertEqual([line for line, _ in importer.errors], [2, 3, 4])
+        self.assertIn("city: Unknown value: Nowhere.", importer.errors[0][1])
+        course = models.Course.objects.get()
+        self.assertEqual(course.title, "Valid")
+        self.assertEqual(course.area.get().name, "Music")
+        self.assertEqual(course.locations.get().currency.iso_code, "EUR")
+
+    def test_batches(self):
+        lines = [self.record(str(i)) for i in range(5)]
+        importer = transfer.CourseImporter(self.professor, batch_size=2)
+        with mock.patch.object(importer, "save", wraps=importer.save) as save:
+            importer.run(transfer.FORMATS["jsonl"], io.StringIO("\n".join(lines)))
+        self.assertEqual([len(call.args[0]) for call in save.call_args_list], [2, 2, 1])
+        self.assertEqual(models.Course.objects.count(), 5)
+        self.assertEqual(models.CourseLocation.objects.count(), 5)
+
+    def test_permissions(self):
+        self.run_import([self.record(str(i)) for i in range(3)])
+        for course in models.Course.objects.all():
+            self.assertTrue(self.user.has_perm("manage_course", course))
+        self.assertEqual(UserObjectPermission.objects.count(), 3)
+
+    @override_settings(COURSE_IMPORT_MAX_ROWS=2, COURSE_IMPORT_MAX_SIZE=2000)
+    def test_view_limits(self):
+        self.client.force_login(self.user)
+        url = reverse("courses:import")
+        lines = [self.record(str(i)) for i in range(3)]
+        upload = SimpleUploadedFile("courses.jsonl", "\n".join(lines).encode())
+        response = self.client.post(url, {"file": upload})
+        self.assertContains(response, "at most 2 courses")
+        self.assertFalse(models.Course.objects.exists())
+
+        upload = SimpleUploadedFile("courses.jsonl", b" " * 2001)
+        response = self.client.post(url, {"file": upload})
+        self.assertContains(response, "must not be larger than")
+
+        upload = SimpleUploadedFile("courses.jsonl", "\n".join(lines[:2]).encode())
+        response = self.client.post(url, {"file": upload})
+        self.assertContains(response, "2 courses imported.")
+
+
+class LifecycleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.professor = create_user(
+            "professor", "access_professor_pages", Professor
+        )
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.since = self.now - timedelta(minutes=5)
+
+    def course(self, **fields):
+        return models.Course.objects.create(professor=self.professor, **fields)
+
+    def run_lifecycle(self, **kwargs):
+        return list(lifecycle.run(self.now, **kwargs))
+
+    def test_edges_passed_since_the_last_run(self):
+        models.LifecycleRun.objects.update_or_create(
+            pk=1, defaults={"ran_at": self.since}
+        )
+        minute = timedelta(minutes=1)
+        expired = self.course(dateexp=self.now - minute)
+        # Switched back on by hand after it expired
+        reactivated = self.course(dateexp=self.now - timedelta(days=1))
+        switched_off = self.course(active=False)
+        hosting = self.course(hosted=True, starthostdate=self.now - minute)
+        hosted = self.course(
+            hosted=True, hostactive=True, endhostdate=self.now - minute
+        )
+        self.professor.dateexpir = self.now - minute
+        self.professor.listed = True
+        self.professor.save()
+        unlisted = create_user("other", "access_professor_pages", Professor)[1]
+        unlisted.listed = False
+        unlisted.save()
+
+        self.run_lifecycle()
+        values = dict(models.Course.objects.values_list("pk", "active").order_by("pk"))
+        self.assertEqual(
+            values,
+            {
+                expired.pk: False,
+                reactivated.pk: True,
+                switched_off.pk: False,
+                hosting.pk: True,
+                hosted.pk: True,
+            },
+        )
+        hostactive = models.Course.objects.in_bulk([hosting.pk, hosted.pk])
+        self.assertTrue(hostactive[hosting.pk].hostactive)
+        self.assertFalse(hostactive[hosted.pk].hostactive)
+        listed = dict(Professor.objects.values_list("pk", "listed"))
+        self.assertEqual(listed, {self.professor.pk: False, unlisted.pk: False})
+        self.assertEqual(models.LifecycleRun.objects.get().ran_at, self.now)
+
+        # Nothing passed since, the manual changes stay
+        models.Course.objects.filter(pk=expired.pk).update(active=True)
+        self.now += minute
+        self.run_lifecycle()
+        self.assertTrue(models.Course.objects.get(pk=expired.pk).active)
+
+    def test_first_run_starts_now(self):
+        models.LifecycleRun.objects.all().delete()
+        course = self.course(dateexp=self.now - timedelta(minutes=1))
+        self.run_lifecycle()
+        self.assertTrue(models.Course.objects.get(pk=course.pk).active)
+        self.run_lifecycle(since=self.since)
+        self.assertFalse(models.Course.objects.get(pk=course.pk).active)
+
+    def test_batches(self):
+        for i in range(5):
+            self.course(dateexp=self.now - timedelta(minutes=1))
+        queryset = models.Course.objects.filter(
+            lifecycle.passed("dateexp", self.since, self.now)
+        )
+        with mock.patch.object(lifecycle.time, "sleep") as sleep:
+            updated, skipped = lifecycle.update_flag(
+                queryset, "active", False, batch_size=2, pause=1
+            )
+        self.assertEqual((updated, skipped), (5, 0))
+        self.assertEqual(sleep.call_count, 3)
+
+    def test_run_with_locked_rows_is_not_recorded(self):
+        models.LifecycleRun.objects.update_or_create(
+            pk=1, defaults={"ran_at": self.since}
+        )
+        with mock.patch.object(lifecycle, "update_flag", return_value=(0, 1)):
+            changes = self.run_lifecycle()
+        self.assertEqual(changes[0][3:], (0, 1))
+        self.assertEqual(models.LifecycleRun.objects.get().ran_at, self.since)
+
+    def test_backfill(self):
+        migration = importlib.import_module(
+            "opencourse.courses.migrations.0008_course_lifecycle"
+        )
+        expired = self.course(dateexp=self.now - timedelta(days=1), active=None)
+        running = self.course(dateexp=self.now + timedelta(days=1), active=None)
+        undated = self.course(active=None)
+        switched_off = self.course(active=False)
+        migration.set_active(apps, None)
+        values = dict(models.Course.objects.values_list("pk", "active"))
+        self.assertEqual(
+            values,
+            {
+                expired.pk: False,
+                running.pk: True,
+                undated.pk: True,
+                switched_off.pk: False,
+            },
+        )
+
+    def test_backfill_from_every_date(self):
+        migration = importlib.import_module(
+            "opencourse.courses.migrations.0013_lifecycle_backfill"
+        )
+        day = timedelta(days=1)
+        expired = self.course(dateexp=self.now - day)
+        running = self.course(dateexp=self.now + day)
+        hosting = self.course(hosted=True, starthostdate=self.now - day)
+        hosted = self.course(
+            hosted=True,
+            hostactive=True,
+            starthostdate=self.now - 2 * day,
+            endhostdate=self.now - day,
+        )
+        self.professor.dateexpir = self.now - day
+        self.professor.listed = True
+        self.professor.save()
+
+        migration.set_flags(apps, None)
+        values = models.Course.objects.in_bulk()
+        self.assertFalse(values[expired.pk].active)
+        self.assertTrue(values[running.pk].active)
+        self.assertTrue(values[hosting.pk].hostactive)
+        self.assertFalse(values[hosted.pk].hostactive)
+        self.assertFalse(Professor.objects.get(pk=self.professor.pk).listed)
+        self.assertGreaterEqual(models.LifecycleRun.objects.get().ran_at, self.now)
+
+
+@skipUnless(connection.features.has_select_for_update_skip_locked, "Needs SKIP LOCKED")
+class LifecycleLockTests(TransactionTestCase):
+    def test_locked_rows_are_skipped(self):
+        user, professor = create_user("professor", "access_professor_pages", Professor)
+        now = timezone.now()
+        courses = [
+            models.Course.objects.create(
+                professor=professor, dateexp=now - timedelta(minutes=1)
+            )
+            for i in range(3)
+        ]
+        locked, released = threading.Event(), threading.Event()
+
+        def lock():
+            # A user saving the course meanwhile
+            try:
+                with transaction.atomic():
+                    models.Course.objects.select_for_update().get(pk=courses[0].pk)
+                    locked.set()
+                    released.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=lock)
+        thread.start()
+        locked.wait(10)
+        try:
+            models.LifecycleRun.objects.update_or_create(
+                pk=1, defaults={"ran_at": now - timedelta(hours=1)}
+            )
+            changes = list(lifecycle.run(now))
+        finally:
+            released.set()
+            thread.join()
+        self.assertEqual(changes[0][3:], (2, 1))
+        self.assertTrue(models.Course.objects.get(pk=courses[0].pk).active)
+        self.assertLess(models.LifecycleRun.objects.get().ran_at, now)
+
+
+class DeletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generatedata",
+            courses=40,
+            professors=4,
+            students=20,
+            centers=2,
+            verbosity=0,
+            stdout=io.StringIO(),
+        )
+        cls.professor = Professor.objects.filter(center__isnull=False).first()
+
+    def count_rows(self):
+        return sum(
+            model._base_manager.count()
+            for model in apps.get_models(include_auto_created=True)
+        )
+
+    def test_schedule_deletion(self):
+        job = schedule_deletion(self.professor)
+        self.assertEqual(job.status, DeletionJob.PENDING)
+        self.assertFalse(Professor.objects.filter(pk=self.professor.pk).exists())
+        self.assertFalse(models.Course.objects.filter(professor=self.professor))
+        self.assertFalse(models.Center.objects.filter(admin=self.professor))
+        self.assertTrue(Professor._base_manager.get(pk=self.professor.pk).hidden)
+
+    def test_rundeletions(self):
+        user = self.professor.user
+        course_pks = list(
+            models.Course.objects.filter(professor=self.professor).values_list(
+                "pk", flat=True
+            )
+        )
+        schedule_deletion(self.professor)
+        before = self.count_rows()
+
+        call_command("rundeletions", once=True, batch_size=7, stdout=io.StringIO())
+        job = DeletionJob.objects.get()
+        self.assertEqual(job.status, DeletionJob.DONE, job.error)
+        self.assertEqual(job.deleted, before - self.count_rows())
+        self.assertFalse(Professor._base_manager.filter(pk=self.professor.pk))
+        self.assertFalse(models.Course._base_manager.filter(pk__in=course_pks))
+        self.assertFalse(models.Center._base_manager.filter(admin=self.professor))
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+
+        content_type = ContentType.objects.get_for_model(models.Course)
+        object_pks = UserObjectPermission.objects.filter(
+            content_type=content_type
+        ).values_list("object_pk", flat=True)
+        existing = {
+            str(pk) for pk in models.Course._base_manager.values_list("pk", flat=True)
+        }
+        self.assertFalse(set(object_pks) - existing)
+
+    def test_cascade_batches(self):
+        course = models.Course.objects.filter(enrollment__isnull=False).first()
+        enrollments = course.enrollment_set.count()
+        progress = []
+        cascade = Cascade(batch_size=2, progress=progress.append)
+        cascade.delete(models.Course.objects.filter(pk=course.pk))
+        self.assertFalse(models.Enrollment.objects.filter(course_id=course.pk))
+        self.assertGreaterEqual(len(progress), (enrollments + 1) // 2 + 1)
+        self.assertEqual(progress[-1], cascade.deleted)
+
+    def test_hidden_professor_is_refused(self):
+        self.client.force_login(self.professor.user)
+        url = reverse("courses:create")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        schedule_deletion(self.professor)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_admin_confirmation(self):
+        staff = User.objects.create_user("staff", is_staff=True)
+        staff.user_permissions.add(
+            *Permission.objects.filter(codename__in=["view_course", "delete_course"])
+        )
+        self.client.force_login(staff)
+        course = models.Course.objects.filter(enrollment__isnull=False).first()
+        url = reverse("admin:courses_course_delete", args=[course.pk])
+        response = self.client.get(url)
+        self.assertIn(
+            models.Enrollment._meta.verbose_name, response.context["perms_lacking"]
+        )
+
+    def test_admin_protected(self):
+        section_admin = type(
+            "SectionAdmin", (BackgroundDeleteAdmin, admin.ModelAdmin), {}
+        )(models.HandoutSection, admin.site)
+        section = models.HandoutSection.objects.create(name="Section")
+        course = models.Course.objects.first()
+        models.Handout.objects.create(course=course, name="Notes", section=section)
+        request = RequestFactory().get("/")
+        request.user = User.objects.create_superuser("admin", "admin@example.com")
+        _, _, perms_needed, protected = section_admin.get_deleted_objects(
+            [section], request
+        )
+        self.assertEqual(perms_needed, set())
+        self.assertEqual(protected, ["Notes"])
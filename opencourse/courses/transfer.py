@@ -0,0 +1,332 @@
+"""Import and export of courses as CSV or JSON lines.
+
+A course is a flat record: the facets are referred to by name, in any
+language on import, and its locations are a list of objects, which is
+stored as JSON in the "locations" column of CSV files.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import translation
+from django.utils.translation import ugettext as _
+from guardian.shortcuts import assign_perm
+from modeltranslation.utils import build_localized_fieldname
+
+from opencourse.core.streaming import chunked, csv_lines, json_lines
+from . import models
+
+FIELDS = [
+    "title",
+    "descrip",
+    "extrainfo",
+    "level",
+    "duration",
+    "city",
+    "center",
+    "areas",
+    "ages",
+    "languages",
+    "locations",
+]
+# Many-to-many fields of the records, with the Course field they fill
+FACETS = {"areas": "area", "ages": "age", "languages": "language"}
+
+
+def course_record(course):
+    def name(obj, field="name"):
+        return None if obj is None else getattr(obj, field)
+
+    return {
+        "title": course.title,
+        "descrip": course.descrip,
+        "extrainfo": course.extrainfo,
+        "level": name(course.level),
+        "duration": name(course.duration, "duration"),
+        "city": name(course.city),
+        "center": name(course.center),
+        "areas": [area.name for area in course.area.all()],
+        "ages": [age.name for age in course.age.all()],
+        "languages": [language.name for language in course.language.all()],
+        "locations": [
+            {
+                "type": name(location.location_type),
+                "price": location.price,
+                "currency": location.currency.iso_code,
+                "sessions": location.number_sessions,
+                "description": location.description,
+            }
+            for location in course.locations.all()
+        ],
+    }
+
+
+class CsvFormat:
+    content_type = "text/csv"
+    separator = "|"
+
+    def header(self):
+        return csv_lines([FIELDS])
+
+    def dump(self, records):
+        return csv_lines(self.row(record) for record in records)
+
+    def row(self, record):
+        row = []
+        for field in FIELDS:
+            value = record[field]
+            if field == "locations":
+                value = json.dumps(value, ensure_ascii=False)
+            elif field in FACETS:
+                value = self.separator.join(value)
+            row.append(value)
+        return row
+
+    def read(self, stream):
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+    def decode(self, row):
+        record = dict(row)
+        for field in FACETS:
+            value = record.get(field) or ""
+            record[field] = [name for name in value.split(self.separator) if name]
+        try:
+            record["locations"] = json.loads(record.get("locations") or "[]")
+        except ValueError:
+            raise ValidationError({"locations": _("Invalid JSON.")})
+        return record
+
+
+class JsonLinesFormat:
+    content_type = "application/x-ndjson"
+
+    def header(self):
+        return ""
+
+    def dump(self, records):
+        return json_lines(records)
+
+    def read(self, stream):
+        for line, text in enumerate(stream, 1):
+            if text.strip():
+                yield line, text
+
+    def decode(self, text):
+        try:
+            record = json.loads(text)
+        except ValueError:
+            raise ValidationError(_("Invalid JSON."))
+        if not isinstance(record, dict):
+            raise ValidationError(_("A course must be a JSON object."))
+        return record
+
+
+FORMATS = {"csv": CsvFormat(), "jsonl": JsonLinesFormat()}
+
+
+def export_courses(queryset, format, language=None, chunk_size=500):
+    """Yield the courses of ``queryset`` serialized by ``format``, a chunk of
+    courses at a time, with the facet names in ``language``.
+    """
+    yield format.header()
+    chunks = chunked(queryset.with_details(), chunk_size)
+    while True:
+        # The translation columns are picked when a chunk is fetched
+        with translation.override(language):
+            courses = next(chunks, None)
+            if courses is None:
+                return
+            data = format.dump(course_record(course) for course in courses)
+        yield data
+
+
+def translated(field):
+    return [field] + [
+        build_localized_fieldname(field, language) for language, _ in settings.LANGUAGES
+    ]
+
+
+class Lookup:
+    """Primary keys of reference rows by any of ``fields``, loaded once."""
+
+    def __init__(self, queryset, *fields):
+        self.keys = {}
+        for row in queryset.values("pk", *fields):
+            for field in fields:
+                if row[field] not in (None, ""):
+                    self.keys.setdefault(self.normalize(row[field]), row["pk"])
+
+    def normalize(self, value):
+        return str(value).strip().casefold()
+
+    def get(self, value):
+        return self.keys.get(self.normalize(value))
+
+
+class TooManyRecords(Exception):
+    pass
+
+
+class CourseImporter:
+    """Validate course records and create the courses of ``professor`` in
+    batches, with their facets, locations and permissions.
+
+    Invalid records are skipped and reported in ``errors`` with their line.
+    Reading more than ``max_records`` records raises TooManyRecords.
+    """
+
+    def __init__(self, professor, batch_size=500, max_records=None):
+        self.professor = professor
+        self.batch_size = batch_size
+        self.max_records = max_records
+        self.created = 0
+        self.errors = []
+        centers = models.Center.objects.filter(
+            Q(joinrequest__professor=professor, joinrequest__accepted=True)
+            | Q(admin=professor)
+        )
+        self.lookups = {
+            "level": Lookup(models.CourseLevel.objects, *translated("name")),
+            "duration": Lookup(models.CourseDuration.objects, "duration"),
+            "city": Lookup(models.City.objects, *translated("name"), "codepostal"),
+            "center": Lookup(centers, "name"),
+            "areas": Lookup(models.CourseArea.objects, *translated("name")),
+            "ages": Lookup(models.CourseAge.objects, *translated("name")),
+            "languages": Lookup(models.CourseLanguage.objects, *translated("name")),
+            "type": Lookup(models.CourseLocationType.objects, *translated("name")),
+            "currency": Lookup(models.Currency.objects, "iso_code", "symbol", "name"),
+        }
+
+    def run(self, format, stream):
+        batch = []
+        for count, (line, raw) in enumerate(format.read(stream), 1):
+            if self.max_records is not None and count > self.max_records:
+                raise TooManyRecords
+            try:
+                batch.append(self.build(format.decode(raw)))
+            except ValidationError as e:
+                self.errors.append((line, self.messages(e)))
+            if len(batch) >= self.batch_size:
+                self.save(batch)
+                batch = []
+        if batch:
+            self.save(batch)
+        return self
+
+    def messages(self, error):
+        if not hasattr(error, "error_dict"):
+            return error.messages
+        return [
+            f"{field}: {message}"
+            for field, messages in error.message_dict.items()
+            for message in messages
+        ]
+
+    def resolve(self, lookup, value, field, errors):
+        if value in (None, ""):
+            return None
+        pk = self.lookups[lookup].get(value)
+        if pk is None:
+            errors.setdefault(field, []).append(
+                _("Unknown value: %(value)s.") % {"value": value}
+            )
+        return pk
+
+    def build(self, record):
+        errors = {}
+        course = models.Course(
+            professor=self.professor,
+            title=record.get("title") or "",
+            descrip=record.get("descrip") or "",
+            extrainfo=record.get("extrainfo") or None,
+            level_id=self.resolve("level", record.get("level"), "level", errors),
+            duration_id=self.resolve(
+                "duration", record.get("duration"), "duration", errors
+            ),
+            city_id=self.resolve("city", record.get("city"), "city", errors),
+            center_id=self.resolve("center", record.get("center"), "center", errors),
+            active=True,
+        )
+        try:
+            course.clean_fields(
+                exclude=["professor", "level", "duration", "city", "center"]
+            )
+        except ValidationError as e:
+            errors.update(e.message_dict)
+
+        facets = {}
+        for field, model_field in FACETS.items():
+            values = record.get(field) or []
+            if not isinstance(values, list):
+                values = [values]
+            facets[model_field] = {
+                self.resolve(field, value, field, errors) for value in values
+            } - {None}
+
+        locations = []
+        for data in record.get("locations") or []:
+            if not isinstance(data, dict):
+                errors.setdefault("locations", []).append(_("Invalid location."))
+                continue
+            location = models.CourseLocation(
+                location_type_id=self.resolve(
+                    "type", data.get("type"), "locations", errors
+                ),
+                currency_id=self.resolve(
+                    "currency", data.get("currency"), "locations", errors
+                ),
+                price=data.get("price"),
+                number_sessions=data.get("sessions") or None,
+                description=data.get("description") or None,
+            )
+            if not data.get("currency"):
+                errors.setdefault("locations", []).append(_("Missing currency."))
+            try:
+                location.clean_fields(exclude=["course", "location_type", "currency"])
+            except ValidationError as e:
+                for field, messages in e.message_dict.items():
+                    errors.setdefault("locations", []).extend(
+                        f"{field}: {message}" for message in messages
+                    )
+            locations.append(location)
+
+        if errors:
+            raise ValidationError(errors)
+        return course, facets, locations
+
+    @transaction.atomic
+    def save(self, batch):
+        courses = [course for course, _, _ in batch]
+        if connection.features.can_return_rows_from_bulk_insert:
+            models.Course.objects.bulk_create(courses)
+        else:
+            # The primary keys are needed for the related rows
+            for course in courses:
+                course.save()
+
+        for field in FACETS.values():
+            m2m = models.Course._meta.get_field(field)
+            through = m2m.remote_field.through
+            column = through._meta.get_field(m2m.m2m_reverse_field_name()).attname
+            through.objects.bulk_create(
+                through(course_id=course.pk, **{column: pk})
+                for course, facets, _ in batch
+                for pk in facets[field]
+            )
+        locations = []
+        for course, _, course_locations in batch:
+            for location in course_locations:
+                location.course = course
+                locations.append(location)
+        models.CourseLocation.objects.bulk_create(locations)
+        assign_perm(
+            "manage_course",
+            self.professor.user,
+            models.Course.objects.filter(pk__in=[course.pk for course in courses]),
+        )
+        self.created += len(courses)
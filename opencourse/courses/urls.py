@@ -12,11 +12,14 @@ course_patterns = [
     path("edit/<int:pk>/", views.CourseEditView.as_view(), name="edit"),
     path("delete/<int:pk>/", views.CourseDeleteView.as_view(), name="delete"),
     path("search/", views.CourseSearchView.as_view(), name="search"),
+    path("export/", views.CourseExportView.as_view(), name="export"),
+    path("import/", views.CourseImportView.as_view(), name="import"),
     path(
         "<int:pk>/students/",
         views.CourseStudentsListView.as_view(),
         name="students_list",
     ),
+    path("<int:pk>/roster/", views.RosterView.as_view(), name="roster"),
     path(
         "search-results/",
         views.CourseSearchResultsView.as_view(),
@@ -28,6 +31,7 @@ enrollment_patterns = [
     path(
         "professor/", views.EnrollmentProfessorListView.as_view(), name="professor_list"
     ),
+    path("professor/roster/", views.RosterView.as_view(), name="professor_roster",),
     path("student/", views.EnrollmentStudentListView.as_view(), name="student_list"),
     path("create", views.EnrollmentCreateView.as_view(), name="create"),
     path("edit/<int:pk>/", views.EnrollmentUpdateStatusView.as_view(), name="edit"),
@@ -35,9 +39,25 @@ enrollment_patterns = [
 
 handout_patterns = [
     path("list/<int:course_pk>/", views.HandoutListView.as_view(), name="list"),
+    path(
+        "download/<int:course_pk>/",
+        views.HandoutArchiveView.as_view(),
+        name="download",
+    ),
     path("create/<int:course_pk>/", views.HandoutCreateView.as_view(), name="create"),
     path("edit/<int:pk>/", views.HandoutUpdateView.as_view(), name="edit"),
     path("delete/<int:pk>/", views.HandoutDeleteView.as_view(), name="delete"),
+    path(
+        "upload/<int:course_pk>/",
+        views.HandoutUploadCreateView.as_view(),
+        name="upload_create",
+    ),
+    path("upload/<uuid:pk>/", views.HandoutUploadView.as_view(), name="upload"),
+    path(
+        "upload/<uuid:pk>/complete/",
+        views.HandoutUploadCompleteView.as_view(),
+        name="upload_complete",
+    ),
 ]
 
 center_patterns = [
@@ -1,8 +1,22 @@
+import io
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
-from django.http import HttpResponse, HttpResponseForbidden
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
+from django.template.defaulttags import GroupedResult
 from django.urls import reverse, reverse_lazy
+from django.utils.text import slugify
+from django.utils.translation import get_language, ugettext_lazy as _
 from django.views.generic import (
     CreateView,
     ListView,
@@ -17,11 +31,20 @@ from django_filters.views import FilterView
 from guardian.mixins import PermissionRequiredMixin
 from guardian.shortcuts import assign_perm
 
-from . import forms, models, filters
+from . import archives, forms, models, filters, transfer
 from opencourse.profiles.models import Student
-from .mixins import FormsetMixin, JsonFormMixin
+from .mixins import (
+    BackgroundDeleteMixin,
+    FormsetMixin,
+    HandoutAccessMixin,
+    JsonFormMixin,
+)
+from opencourse.core.instrumentation import QueryBudget
+from opencourse.core.paginator import ApproximateCountPaginator
+from opencourse.core.streaming import csv_stream
 from opencourse.profiles.forms import ReviewForm
 from opencourse.profiles.mixins import ProfessorRequiredMixin, StudentRequiredMixin
+from django.views.generic.detail import SingleObjectMixin
 from django.views.generic.list import MultipleObjectMixin
 
 
@@ -96,13 +119,17 @@ class CourseDetailView(DetailView):
     model = models.Course
     template_name = "courses/course_detail.html"
     paginate_by = 10
+    query_budget = QueryBudget(queries=18, duplicates=2)
+
+    def get_queryset(self):
+        return models.Course.objects.with_details()
 
     def get_context_data(self, **kwargs):
         kwargs["review_form"] = ReviewForm()
         kwargs["professor"] = self.object.professor
-        kwargs["reviews"] = self.object.professor.review_set.order_by("-id")[
-            :REVIEW_COUNT
-        ]
+        kwargs["reviews"] = self.object.professor.review_set.prefetch_related(
+            "author__user"
+        ).order_by("-id")[:REVIEW_COUNT]
         kwargs["reviews_count"] = kwargs["reviews"].count()
         student = getattr(self.request.user, "student", None)
         kwargs["enrollment_form"] = forms.EnrollmentCreateForm(
@@ -116,12 +143,58 @@ class CourseDetailView(DetailView):
         return super().get_context_data(**kwargs)
 
 
-class CourseDeleteView(CoursePermissionRequiredMixin, DeleteView):
+class CourseDeleteView(
+    CoursePermissionRequiredMixin, BackgroundDeleteMixin, DeleteView
+):
     model = models.Course
     success_url = reverse_lazy("courses:list")
     template_name = "confirm_delete.html"
 
 
+class CourseExportView(ProfessorRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        name = request.GET.get("format", "csv")
+        if name not in transfer.FORMATS:
+            raise Http404
+        format = transfer.FORMATS[name]
+        courses = models.Course.objects.created_by(request.user.professor)
+        response = StreamingHttpResponse(
+            transfer.export_courses(courses, format, get_language()),
+            content_type=format.content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="courses.{name}"'
+        return response
+
+
+class CourseImportView(ProfessorRequiredMixin, FormView):
+    form_class = forms.CourseImportForm
+    template_name = "courses/course_import.html"
+
+    def form_valid(self, form):
+        upload = form.cleaned_data["file"]
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        importer = transfer.CourseImporter(
+            self.request.user.professor, max_records=settings.COURSE_IMPORT_MAX_ROWS,
+        )
+        # A file that can't be read to the end imports nothing
+        try:
+            with transaction.atomic():
+                importer.run(transfer.FORMATS[form.cleaned_data["format"]], stream)
+        except UnicodeDecodeError:
+            form.add_error("file", _("The file must be encoded in UTF-8."))
+            importer = None
+        except transfer.TooManyRecords:
+            form.add_error(
+                "file",
+                _("A file may hold at most %(count)s courses.")
+                % {"count": settings.COURSE_IMPORT_MAX_ROWS},
+            )
+            importer = None
+        return self.render_to_response(
+            self.get_context_data(form=form, importer=importer)
+        )
+
+
 class CourseSearchView(FormView):
     template_name = "courses/course_search.html"
     form_class = forms.CourseSearchForm
@@ -132,36 +205,52 @@ class CourseSearchResultsView(FilterView):
     filterset_class = filters.CourseFilter
     template_name = "courses/course_search_results.html"
     paginate_by = 10
+    paginator_class = ApproximateCountPaginator
 
+    def get_queryset(self):
+        return (
+            models.Course.objects.filter(active=True)
+            .select_related("professor__user", "city")
+            .prefetch_related("area")
+            .order_by("-pk")
+        )
 
-class HandoutListView(LoginRequiredMixin, ListView):
+
+class HandoutListView(HandoutAccessMixin, ListView):
     model = models.Handout
     template_name = "courses/handout_list.html"
 
     def get_queryset(self):
-        course_pk = self.kwargs.get("course_pk")
-        course = get_object_or_404(models.Course, pk=course_pk)
-        object_list = self.model.objects.filter(course=course).order_by("section")
-        return object_list
+        return self.course.handout_set.select_related("section").order_by(
+            "section", "pk"
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course_pk = self.kwargs.get("course_pk")
-        context["course"] = get_object_or_404(models.Course, pk=course_pk)
+        context["course"] = self.course
+        context["sections"] = [
+            GroupedResult(grouper=section, list=list(handouts))
+            for section, handouts in groupby(
+                context["object_list"], key=attrgetter("section")
+            )
+        ]
         return context
 
-    def dispatch(self, request, *args, **kwargs):
-        if self.request.user.is_student:
-            course_pk = self.kwargs.get("course_pk")
-            course = get_object_or_404(models.Course, pk=course_pk)
-            student = self.request.user.student
-            enrollment = models.Enrollment.objects.filter(
-                course=course, student=student
-            ).first()
-            has_access = getattr(enrollment, "accepted", False)
-            if not has_access:
-                return self.handle_no_permission()
-        return super().dispatch(request, *args, **kwargs)
+
+class HandoutArchiveView(HandoutAccessMixin, View):
+    def get(self, request, *args, **kwargs):
+        handouts = (
+            self.course.handout_set.select_related("section")
+            .exclude(attachment="")
+            .order_by("section", "pk")
+        )
+        response = StreamingHttpResponse(
+            archives.stream_zip(archives.handout_entries(handouts.iterator())),
+            content_type="application/zip",
+        )
+        filename = slugify(self.course.title) or "handouts"
+        response["Content-Disposition"] = f'attachment; filename="{filename}.zip"'
+        return response
 
 
 class HandoutUpdateView(ProfessorRequiredMixin, UpdateView):
@@ -175,7 +264,7 @@ class HandoutUpdateView(ProfessorRequiredMixin, UpdateView):
         return reverse("courses:handouts:list", kwargs={"course_pk": course.pk})
 
 
-class HandoutDeleteView(ProfessorRequiredMixin, DeleteView):
+class HandoutDeleteView(ProfessorRequiredMixin, BackgroundDeleteMixin, DeleteView):
     model = models.Handout
     template_name = "confirm_delete.html"
 
@@ -201,6 +290,103 @@ class HandoutCreateView(ProfessorRequiredMixin, CreateView):
         return reverse("courses:handouts:list", kwargs={"course_pk": course_pk})
 
 
+class HandoutUploadMixin(ProfessorRequiredMixin):
+    model = models.HandoutUpload
+
+    def get_queryset(self):
+        return self.model.objects.created_by(self.request.user.professor)
+
+    def upload_status(self, upload, status=200):
+        data = {
+            "id": str(upload.pk),
+            "offset": upload.offset,
+            "size": upload.size,
+            "chunk_size": settings.HANDOUT_UPLOAD_CHUNK_SIZE,
+            "url": reverse("courses:handouts:upload", kwargs={"pk": upload.pk}),
+            "complete_url": reverse(
+                "courses:handouts:upload_complete", kwargs={"pk": upload.pk}
+            ),
+        }
+        return JsonResponse(data, status=status)
+
+
+class HandoutUploadCreateView(HandoutUploadMixin, JsonFormMixin, CreateView):
+    form_class = forms.HandoutUploadForm
+    http_method_names = ["post"]
+
+    def form_valid(self, form):
+        form.instance.professor = self.request.user.professor
+        form.instance.course = get_object_or_404(
+            models.Course,
+            pk=self.kwargs.get("course_pk"),
+            professor=form.instance.professor,
+        )
+        self.object = form.save()
+        return self.upload_status(self.object, status=201)
+
+
+class HandoutUploadView(HandoutUploadMixin, SingleObjectMixin, View):
+    """Report the received offset (GET) or append one chunk (PUT).
+
+    Chunks are sent as raw request bodies with an ``Upload-Offset`` header and
+    an optional ``Upload-Checksum`` (SHA-256 of the chunk). A client resuming
+    after a failure asks for the offset and continues from there.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return self.upload_status(self.get_object())
+
+    def put(self, request, *args, **kwargs):
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return JsonResponse({"success": False}, status=400)
+
+        with transaction.atomic():
+            upload = self.get_object(self.get_queryset().select_for_update())
+            if offset != upload.offset:
+                return self.upload_status(upload, status=409)
+            if length <= 0 or offset + length > upload.size:
+                return JsonResponse({"success": False}, status=400)
+            try:
+                upload.write_chunk(
+                    request, length, request.headers.get("Upload-Checksum")
+                )
+            except models.ChunkError as e:
+                return JsonResponse({"success": False, "errors": str(e)}, status=400)
+        return self.upload_status(upload)
+
+
+class HandoutUploadCompleteView(HandoutUploadMixin, JsonFormMixin, CreateView):
+    form_class = forms.HandoutUploadCompleteForm
+    http_method_names = ["post"]
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            upload = get_object_or_404(
+                self.get_queryset().select_for_update(), pk=self.kwargs.get("pk")
+            )
+            if not upload.is_complete:
+                return self.upload_status(upload, status=409)
+            if not upload.verify():
+                upload.discard()
+                data = {
+                    "success": False,
+                    "errors": {"checksum": _("Checksum mismatch.")},
+                }
+                return JsonResponse(data, status=400)
+            form.instance.course = upload.course
+            upload.assemble(form.instance)
+            self.object = form.save()
+        # The part is moved to the storage on commit, it can go now
+        upload.discard()
+        success_url = reverse(
+            "courses:handouts:list", kwargs={"course_pk": self.object.course_id}
+        )
+        return JsonResponse({"success": True, "redirect": success_url})
+
+
 class EnrollmentUpdateStatusView(ProfessorRequiredMixin, JsonFormMixin, UpdateView):
     model = models.Enrollment
     fields = ["accepted"]
@@ -225,14 +411,65 @@ class EnrollmentStudentListView(StudentRequiredMixin, ListView):
 class EnrollmentProfessorListView(ProfessorRequiredMixin, ListView):
     model = models.Enrollment
     template_name = "courses/enrollment_list.html"
+    query_budget = QueryBudget(queries=10, duplicates=2)
 
     def get_queryset(self):
-        object_list = self.model.objects.filter(
-            course__professor=self.request.user.professor
-        ).order_by("accepted")
+        object_list = (
+            self.model.objects.filter(course__professor=self.request.user.professor)
+            .select_related("course", "student__user")
+            .order_by("accepted")
+        )
         return object_list
 
 
+class RosterView(ProfessorRequiredMixin, View):
+    """Stream as CSV, from a server-side cursor, the enrollments of the course
+    ``pk`` or, without it, of all the professor's courses.
+    """
+
+    columns = [
+        ("course__title", _("Course")),
+        ("student__user__username", _("Username")),
+        ("student__user__first_name", _("First name")),
+        ("student__user__last_name", _("Last name")),
+        ("student__email", _("Email")),
+        ("student__user__email", _("Account email")),
+        ("student__tel", _("Phone")),
+        ("student__whatsapp", _("WhatsApp")),
+        ("student__address", _("Address")),
+        ("student__city", _("City")),
+        ("accepted", _("Status")),
+    ]
+    statuses = {True: _("Accepted"), False: _("Rejected"), None: _("Pending")}
+
+    def get(self, request, *args, **kwargs):
+        enrollments = models.Enrollment.objects.filter(
+            course__professor=request.user.professor
+        )
+        filename = "enrollments"
+        if "pk" in kwargs:
+            course = get_object_or_404(
+                models.Course, pk=kwargs["pk"], professor=request.user.professor
+            )
+            enrollments = enrollments.filter(course=course)
+            filename = slugify(course.title) or "roster"
+        fields = [field for field, label in self.columns]
+        rows = (
+            enrollments.order_by("course", "student__user__last_name", "pk")
+            .values_list(*fields)
+            .iterator()
+        )
+        response = StreamingHttpResponse(
+            csv_stream(
+                (row[:-1] + (self.statuses[row[-1]],) for row in rows),
+                header=[label for field, label in self.columns],
+            ),
+            content_type="text/csv",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+        return response
+
+
 class CourseStudentsListView(ProfessorRequiredMixin, ListView):
     model = models.Course
     template_name = "courses/course_students_list.html"
@@ -290,6 +527,10 @@ class CenterDetailView(DetailView, MultipleObjectMixin):
     model = models.Center
     template_name = "courses/center_detail.html"
     paginate_by = 3
+    query_budget = QueryBudget(queries=16, duplicates=2)
+
+    def get_queryset(self):
+        return models.Center.objects.select_related("admin__user")
 
     def get_context_data(self, **kwargs):
         professor = getattr(self.request.user, "professor", None)
@@ -302,13 +543,15 @@ class CenterDetailView(DetailView, MultipleObjectMixin):
         kwargs["join_request_accepted"] = getattr(
             join_request, "accepted", "not_existing"
         )
-        object_list = models.Course.objects.filter(center=self.get_object())
+        object_list = models.Course.objects.with_details().filter(
+            center=self.object, active=True
+        )
         return super(CenterDetailView, self).get_context_data(
             object_list=object_list, **kwargs
         )
 
 
-class CenterDeleteView(ProfessorRequiredMixin, DeleteView):
+class CenterDeleteView(ProfessorRequiredMixin, BackgroundDeleteMixin, DeleteView):
     model = models.Center
     success_url = reverse_lazy("courses:centers:list")
     template_name = "confirm_delete.html"
@@ -318,6 +561,7 @@ class CenterSearchResultsView(FilterView):
     filterset_class = filters.CenterFilter
     template_name = "courses/center_search_results.html"
     paginate_by = 10
+    paginator_class = ApproximateCountPaginator
 
 
 class JoinRequestCreateView(ProfessorRequiredMixin, JsonFormMixin, CreateView):
@@ -1,12 +1,41 @@
 from django.contrib import admin
+from opencourse.core.admin import BackgroundDeleteAdmin, LargeTableAdmin
 from . import models
 
-model_objects = (
-    models.Professor,
-    models.Student,
-    models.Review,
-    models.User,
-)
 
-for m in model_objects:
-    admin.site.register(m)
+class ProfileAdmin(LargeTableAdmin, admin.ModelAdmin):
+    list_display = ["__str__", "user", "tel"]
+    list_select_related = ["user"]
+    search_fields = ["=user__username", "=user__email", "^user__last_name"]
+    autocomplete_fields = ["user"]
+
+    def get_queryset(self, request):
+        # Profiles are named after their user, in autocomplete results too
+        return super().get_queryset(request).select_related("user")
+
+
+@admin.register(models.Professor)
+class ProfessorAdmin(BackgroundDeleteAdmin, ProfileAdmin):
+    list_display = ProfileAdmin.list_display + ["listed", "feespaid"]
+    list_filter = ["listed", "feespaid"]
+
+
+@admin.register(models.Student)
+class StudentAdmin(ProfileAdmin):
+    pass
+
+
+@admin.register(models.Review)
+class ReviewAdmin(LargeTableAdmin, admin.ModelAdmin):
+    list_display = ["__str__", "professor", "score"]
+    list_select_related = ["professor__user"]
+    list_filter = ["score"]
+    autocomplete_fields = ["professor"]
+
+
+@admin.register(models.User)
+class UserAdmin(LargeTableAdmin, admin.ModelAdmin):
+    list_display = ["username", "email", "first_name", "last_name", "is_staff"]
+    list_filter = ["is_staff", "is_superuser", "is_active"]
+    search_fields = ["=username", "=email", "^last_name"]
+    date_hierarchy = "date_joined"
@@ -5,3 +5,6 @@ from django.apps import AppConfig
 class ProfilesConfig(AppConfig):
     name = "opencourse.profiles"
     verbose_name = _("Profiles")
+
+    def ready(self):
+        from . import signals  # noqa
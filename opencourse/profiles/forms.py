@@ -7,6 +7,7 @@ from django.contrib.auth.models import Permission, Group
 from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext_lazy as _
 from allauth.account.forms import SignupForm
+from opencourse.core.forms import PictureField
 from . import models
 
 
@@ -77,6 +78,7 @@ class ProfessorForm(forms.ModelForm):
             "yearsexperience": _("Years of experience"),
             "picture": _("Picture"),
         }
+        field_classes = {"picture": PictureField}
         widgets = {"dob": forms.DateInput(attrs={"type": "date"})}
 
 
@@ -93,6 +95,7 @@ class StudentForm(forms.ModelForm):
             "city": _("City"),
             "picture": _("Picture"),
         }
+        field_classes = {"picture": PictureField}
         widgets = {"dob": forms.DateInput(attrs={"type": "date"})}
 
 
@@ -0,0 +1,8 @@
+from django.db import models
+
+
+class ProfessorManager(models.Manager):
+    use_for_related_fields = True
+
+    def get_queryset(self):
+        return super().get_queryset().filter(hidden=False)
@@ -0,0 +1,21 @@
+# Generated by Django 3.0.5 on 2026-10-19 18:15
+
+from django.db import migrations, models
+
+from opencourse.core.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='review',
+            index=models.Index(fields=['professor', '-id'], name='review_professor_id'),
+        ),
+    ]
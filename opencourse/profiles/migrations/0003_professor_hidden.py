@@ -0,0 +1,18 @@
+# Generated by Django 3.0.5 on 2026-10-19 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_review_professor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professor',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from opencourse.core.db.operations import AddUpperIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('profiles', '0003_professor_hidden'),
+    ]
+
+    operations = [
+        AddUpperIndexConcurrently('profiles_user', 'username', 'user_username_upper'),
+        AddUpperIndexConcurrently('profiles_user', 'email', 'user_email_upper'),
+        AddUpperIndexConcurrently('profiles_user', 'last_name', 'user_last_name_upper'),
+    ]
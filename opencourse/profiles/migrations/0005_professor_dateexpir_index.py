@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+from opencourse.core.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The index is built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('profiles', '0004_admin_search_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='professor',
+            index=models.Index(fields=['dateexpir'], name='professor_dateexpir'),
+        ),
+    ]
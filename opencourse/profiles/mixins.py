@@ -6,6 +6,11 @@ class ProfessorRequiredMixin(PermissionRequiredMixin):
     permission_required = "profiles.access_professor_pages"
     login_url = reverse_lazy("profiles:403")
 
+    def has_permission(self):
+        # Professors whose deletion is scheduled are hidden until it runs
+        professor = getattr(self.request.user, "professor", None)
+        return super().has_permission() and not (professor and professor.hidden)
+
 
 class StudentRequiredMixin(PermissionRequiredMixin):
     permission_required = "profiles.access_student_pages"
@@ -6,6 +6,8 @@ from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import ugettext_lazy as _
 from guardian.mixins import GuardianUserMixin
 
+from .managers import ProfessorManager
+
 
 class User(GuardianUserMixin, AbstractUser):
     @property
@@ -67,10 +69,18 @@ class Professor(Profile):
     dateexpir = models.DateTimeField(blank=True, null=True)
     listed = models.NullBooleanField()
     feespaid = models.NullBooleanField()
+    # Set on deletion, until the deletion job removes the professor
+    hidden = models.BooleanField(default=False)
+
+    objects = ProfessorManager()
+
+    # Hidden along with the professor, see core.deletion
+    hidden_with = ("course_set", "center_set")
 
     class Meta(Profile.Meta):
         verbose_name = _("Professor")
         verbose_name_plural = _("Professors")
+        indexes = [models.Index(fields=["dateexpir"], name="professor_dateexpir")]
 
     @property
     def average_score(self):
@@ -91,6 +101,10 @@ class Review(models.Model):
     class Meta:
         verbose_name = _("Review")
         verbose_name_plural = _("Reviews")
+        indexes = [
+            # The latest reviews of a professor, as on the course pages
+            models.Index(fields=["professor", "-id"], name="review_professor_id")
+        ]
 
     def __str__(self):
         return self.text
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from opencourse.core.images import delete_picture, enqueue_renditions, replace_picture
+from . import models
+
+
+@receiver(pre_save, sender=models.Professor)
+@receiver(pre_save, sender=models.Student)
+def release_replaced_picture(sender, instance, update_fields=None, **kwargs):
+    instance._picture_changed = replace_picture(instance, update_fields)
+
+
+@receiver(post_save, sender=models.Professor)
+@receiver(post_save, sender=models.Student)
+def queue_picture_renditions(sender, instance, **kwargs):
+    if instance._picture_changed:
+        enqueue_renditions(instance.picture)
+
+
+@receiver(post_delete, sender=models.Professor)
+@receiver(post_delete, sender=models.Student)
+def delete_profile_picture(sender, instance, **kwargs):
+    name, storage = instance.picture.name, instance.picture.storage
+    transaction.on_commit(lambda: delete_picture(name, storage))
@@ -103,7 +103,7 @@ class ContactRequestView(SingleObjectMixin, View):
     def post(self, *args, **kwargs):
         professor = self.get_object()
         professor.contacts_requests += 1
-        professor.save()
+        professor.save(update_fields=["contacts_requests"])
         return HttpResponse()
 
 
@@ -0,0 +1,152 @@
+// Chunked, resumable handout uploads.
+//
+// The file is sent in chunks to the upload endpoints; an interrupted upload is
+// resumed from the offset reported by the server. The upload id is kept in
+// localStorage so reloading the page and picking the same file resumes it too.
+(function () {
+  let form = document.getElementById("handout-upload-form");
+  if (!form || !window.crypto || !window.crypto.subtle || !window.fetch) {
+    return;
+  }
+  let csrftoken = form.querySelector("[name=csrfmiddlewaretoken]").value;
+  let progress = document.getElementById("handout-upload-progress");
+  let progressBar = progress.querySelector(".progress-bar");
+  let errorBox = document.getElementById("handout-upload-error");
+  let maxRetries = 5;
+
+  function toHex(buffer) {
+    return Array.from(new Uint8Array(buffer))
+      .map(b => b.toString(16).padStart(2, "0"))
+      .join("");
+  }
+
+  async function sha256(blob) {
+    return toHex(await crypto.subtle.digest("SHA-256", await blob.arrayBuffer()));
+  }
+
+  function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+  }
+
+  async function request(url, options) {
+    options.headers = Object.assign({"X-CSRFToken": csrftoken}, options.headers);
+    options.credentials = "same-origin";
+    for (let attempt = 0; ; attempt++) {
+      try {
+        return await fetch(url, options);
+      } catch (e) {
+        if (attempt >= maxRetries) {
+          throw e;
+        }
+        await sleep(1000 * Math.pow(2, attempt));
+      }
+    }
+  }
+
+  async function errorMessage(response) {
+    try {
+      let errors = (await response.json()).errors;
+      if (errors) {
+        return typeof errors === "string" ? errors : Object.values(errors).join(" ");
+      }
+    } catch (e) {
+      // Not a JSON response
+    }
+    return response.statusText;
+  }
+
+  function showProgress(offset, size) {
+    progress.classList.remove("d-none");
+    progressBar.style.width = Math.floor(100 * offset / size) + "%";
+  }
+
+  async function startUpload(file, checksum) {
+    let key = ["handout-upload", form.dataset.uploadUrl, file.name, file.size, checksum].join(":");
+    let saved = localStorage.getItem(key);
+    if (saved) {
+      let response = await request(saved, {method: "GET"});
+      if (response.ok) {
+        return [key, await response.json()];
+      }
+      localStorage.removeItem(key);
+    }
+    let data = new FormData();
+    data.append("filename", file.name);
+    data.append("size", file.size);
+    data.append("checksum", checksum);
+    let response = await request(form.dataset.uploadUrl, {method: "POST", body: data});
+    if (!response.ok) {
+      throw new Error(Object.values((await response.json()).errors).join(" "));
+    }
+    let status = await response.json();
+    localStorage.setItem(key, status.url);
+    return [key, status];
+  }
+
+  async function sendChunks(file, status) {
+    let failures = 0;
+    while (status.offset < status.size) {
+      showProgress(status.offset, status.size);
+      let chunk = file.slice(status.offset, status.offset + status.chunk_size);
+      let response = await request(status.url, {
+        method: "PUT",
+        body: chunk,
+        headers: {
+          "Content-Type": "application/octet-stream",
+          "Upload-Offset": status.offset,
+          "Upload-Checksum": await sha256(chunk),
+        },
+      });
+      if (response.ok || response.status === 409) {
+        status = await response.json();
+        failures = 0;
+      } else if (response.status === 400 && failures < maxRetries) {
+        // A chunk corrupted on the way fails its checksum, send it again
+        await sleep(1000 * Math.pow(2, failures++));
+      } else {
+        throw new Error(await errorMessage(response));
+      }
+    }
+    showProgress(status.size, status.size);
+    return status;
+  }
+
+  async function upload(file) {
+    let checksum = await sha256(file);
+    let [key, status] = await startUpload(file, checksum);
+    let data = new FormData(form);
+    data.delete("attachment");
+    for (;;) {
+      // An incomplete upload is reported with its offset, send the rest.
+      status = await sendChunks(file, status);
+      let response = await request(status.complete_url, {method: "POST", body: data});
+      let result = await response.json();
+      if (response.status === 409) {
+        status = result;
+        continue;
+      }
+      if (!response.ok) {
+        if (result.errors && result.errors.checksum) {
+          localStorage.removeItem(key);
+        }
+        throw new Error(Object.values(result.errors || {}).join(" "));
+      }
+      localStorage.removeItem(key);
+      window.location = result.redirect;
+      return;
+    }
+  }
+
+  form.addEventListener("submit", function (e) {
+    let file = form.querySelector("[name=attachment]").files[0];
+    if (!file) {
+      return;
+    }
+    e.preventDefault();
+    errorBox.classList.add("d-none");
+    upload(file).catch(function (error) {
+      errorBox.textContent = error.message;
+      errorBox.classList.remove("d-none");
+    });
+  });
+})();